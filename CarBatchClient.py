@@ -0,0 +1,96 @@
+import sys
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from Constants import NB_RADARS, PORT
+from Protocol import (MSG_OBSERVATION, MSG_STEP, MessageReader, connect, decode_records, encode_action,
+                      encode_hello, encode_reset, recv_message)
+
+
+class CarBatchClient(VecEnv):
+    """
+    Vectorized environment driving num_envs cars of a RaceServer through a
+    single connection: one batched action message and one batched answer
+    per step, whatever the number of cars.
+
+    Same spaces, observations and rewards as a SubprocVecEnv of CarClient,
+    and done cars are reset automatically with their last observation in
+    infos["terminal_observation"], as SB3 expects.
+    """
+
+    def __init__(self, num_envs, id=0, map_id=None, port=PORT):
+        self.reader = MessageReader()
+        self.id = id
+        self.render_mode = None
+
+        # Same Spaces As CarClient
+        action_space = spaces.Box(low=-1, high=1, shape=[2], dtype=np.float32)
+        observation_space = spaces.Box(low=0, high=1, shape=[NB_RADARS], dtype=np.float32)
+        super(CarBatchClient, self).__init__(num_envs, observation_space, action_space)
+
+        self.actions = np.zeros((num_envs, 2), dtype=np.float32)
+        self.conn = connect(port=port)
+        # Every Car Of The Connection Drives On `map_id`, Or On The Map Assigned By The Server
+        options = {} if map_id is None else {"map": map_id}
+        self.conn.send(encode_hello(id, proto="binary", cars=num_envs, **options))
+        ready = self.conn.recv(1024).decode('utf-8')
+        if ready != "go":
+            print("Server not ready")
+            sys.exit(1)
+
+    def reset(self):
+        self.conn.sendall(encode_reset())
+        obs = decode_records(MSG_OBSERVATION, self.receive(MSG_OBSERVATION))["obs"].copy()
+        self._reset_seeds()
+        self._reset_options()
+        return obs
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions, dtype=np.float32).reshape(self.num_envs, 2)
+        self.conn.sendall(encode_action(self.actions))
+
+    def step_wait(self):
+        records = decode_records(MSG_STEP, self.receive(MSG_STEP))
+        obs = records["obs"].copy()
+        rewards = records["reward"].copy()
+        dones = records["terminated"].astype(bool)
+        infos = [{} for _ in range(self.num_envs)]
+
+        done_cars = np.flatnonzero(dones)
+        if done_cars.size:
+            for car in done_cars:
+                infos[car]["terminal_observation"] = obs[car].copy()  # Its Row Is Overwritten By The Reset
+                infos[car]["TimeLimit.truncated"] = False
+            self.conn.sendall(encode_reset(done_cars))
+            obs[done_cars] = decode_records(MSG_OBSERVATION, self.receive(MSG_OBSERVATION))["obs"][done_cars]
+
+        return obs, rewards, dones, infos
+
+    def receive(self, message_type):
+        # Payload Of The Next Message, Which Must Be Of The Given Type
+        message = recv_message(self.conn, self.reader)
+        if message is None:
+            raise ConnectionError("Client {}: Server closed the connection".format(self.id))
+        if message[0] != message_type:
+            raise ConnectionError("Client {}: Unexpected message type {}".format(self.id, message[0]))
+        return message[1]
+
+    def close(self):
+        self.conn.close()
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Resolved On The Client Like get_attr, Unknown Methods Raise AttributeError
+        # Client Methods Act On The Whole Batch: Called Once, Their Result Is Returned For Every Index
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
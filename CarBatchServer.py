@@ -0,0 +1,92 @@
+import numpy as np
+
+from Constants import RADAR_MAX_LENGTH
+from Protocol import (MSG_ACTION, MSG_RESET, MessageReader, ProtocolError, decode_records, encode_observation,
+                      encode_step)
+
+
+class CarBatchServer:
+    """
+    Connection of a client driving several cars of a RaceWorld (see CarBatchClient).
+
+    Seen by RaceServer like a CarServer whose `slot` is the array of its
+    cars' slots: poll_action returns one [steering, throttle] row per car
+    and send_step answers every car in a single binary message.
+    """
+
+    def __init__(self, car_id, conn, addr, world, slots):
+        # Socket Connection to AI Client
+        self.car_id = car_id
+        self.conn = conn
+        self.addr = addr
+        self.isConnected = True
+        self.protocol = "binary"
+        self.reader = MessageReader()
+        self.steps = 0  # Actions Served Since Connection
+
+        # The Cars Of This Connection, In The Order Of Their Records
+        self.world = world
+        self.slot = np.asarray(slots, dtype=np.int64)
+
+    def poll_action(self):
+        # Read Once From The Socket (Only Blocks If Nothing Is Buffered Nor Readable)
+        # Serves A Reset Request, Returns The Actions Or None If There Are None Yet
+        try:
+            return self.receive_binary_packet()
+        except ProtocolError as error:
+            # A Malformed Frame Only Drops This Client, Not The Race
+            print("Server Car {}: {}".format(self.car_id, error))
+            self.disconnect()
+            return None
+
+    def receive_binary_packet(self):
+        message = self.reader.next_message()
+        if message is None:
+            data = self.conn.recv(65536)
+            if not data:
+                print('deconnected')
+                self.disconnect()
+                return None
+            self.reader.feed(data)
+            message = self.reader.next_message()
+            if message is None:
+                return None
+        message_type, payload = message
+
+        if message_type == MSG_RESET:
+            cars = decode_records(MSG_RESET, payload)["car"] if payload else None
+            if cars is not None and np.any(cars >= len(self.slot)):
+                print("Server Car {}: Reset of unknown cars: {}".format(self.car_id, cars.tolist()))
+                self.disconnect()
+                return None
+            self.reset(cars)
+            return None
+
+        actions = decode_records(MSG_ACTION, payload) if message_type == MSG_ACTION else None
+        if actions is None or len(actions) != len(self.slot):
+            print("Server Car {}: Unexpected message received: type {}, {} bytes".format(self.car_id, message_type,
+                                                                                     len(payload)))
+            self.disconnect()
+            return None
+
+        return np.stack((actions["steering"], actions["throttle"]), axis=-1).astype(np.float64)
+
+    def reset(self, cars=None):
+        # Reset Every Car Of The Connection, Or Only Those Indices, Then Send Every Observation
+        self.world.reset(self.slot if cars is None else self.slot[cars])
+        self.send_reset()
+
+    def send_step(self):
+        self.conn.sendall(encode_step(self.world.radar_dist[self.slot] / RADAR_MAX_LENGTH,
+                                      self.world.reward[self.slot],
+                                      ~self.world.alive[self.slot]))
+
+    def send_reset(self):
+        self.conn.sendall(encode_observation(self.world.radar_dist[self.slot] / RADAR_MAX_LENGTH))
+
+    def send_go(self):
+        self.conn.send("go".encode('utf-8'))
+
+    def disconnect(self):
+        self.conn.close()
+        self.isConnected = False
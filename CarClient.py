@@ -1,42 +1,71 @@
 import re
-import socket
 import gymnasium as gym
 import sys
 import numpy as np
-import math
-import pygame
-import select
 from gymnasium import spaces
-from stable_baselines3.common.env_checker import check_env
-from stable_baselines3 import A2C
 
-import CarServer
+# Imported By Every Training Worker: Only What A Client Needs, No Server, pygame Or Learning Library
+from Constants import NB_RADARS, PORT, RADAR_MAX_LENGTH
+from Protocol import (MSG_OBSERVATION, MSG_STEP, MessageReader, connect, decode_records, encode_action,
+                      encode_hello, encode_reset, recv_message)
+from SharedTransport import COMMAND_CLOSE, COMMAND_HELLO, COMMAND_RESET, COMMAND_STEP
 
 iteration = 0
 
 ACTION_PACKET_REGEX = re.compile("^o((\d{1,3},?){5})r(\d+.\d+)t([01])$")
 RESET_PACKET_REGEX = re.compile("^o((\d{1,3},?){5})$")
 
-HOST = "127.0.0.1"
-PORT = 1236
+
+def encode_action_packet(action):
+    steering_action = action[0]  # steering value between -1 and 1
+    throttle_action = action[1]  # throttle value between -1 and 1
+    return f"s{steering_action:.2f}t{throttle_action:.2f}".encode('utf-8')
+
+
+def decode_radars(radars):
+    obs = np.zeros(NB_RADARS, dtype=np.float32)
+    for i, radar in enumerate(float(x) for x in radars.split(',')):
+        obs[i] = radar / RADAR_MAX_LENGTH
+    return obs
+
+
+def decode_step_packet(answer):
+    # obs, reward, terminated
+    match = re.finditer(ACTION_PACKET_REGEX, answer).__next__()
+    return decode_radars(match.group(1)), float(match.group(3)), bool(int(match.group(4)))
+
+
+def decode_reset_packet(answer):
+    match = re.finditer(RESET_PACKET_REGEX, answer).__next__()
+    return decode_radars(match.group(1))
+
 
 class CarClient(gym.Env):
     print('init')
     metadata = {'render.modes': ['human']}
 
-    def __init__(self, id=0):
+    def __init__(self, id=0, protocol="text", map_id=None, port=PORT):
         super(CarClient, self).__init__()
 
+        # "text" Packets Or "binary" Frames (See Protocol)
+        self.protocol = protocol
+        # Map To Drive On When The Server Hosts Several, None = Assigned By The Server
+        self.map_id = map_id
+        self.reader = MessageReader()
+
         # Define action and observation space
         # Output 2 * [-1 -> 1] for steering and acceleration
         self.action_space = spaces.Box(low=-1, high=1, shape=[2], dtype=np.float32)
         # Input 5 * [0 -> 1] for the 5 radars
         self.observation_space = spaces.Box(low=0, high=1, shape=[5], dtype=np.float32)
 
-        self.conn = socket.socket()
-        self.conn.connect((HOST, PORT))
+        self.conn = connect(port=port)  # Waits For The Server If It Is Still Starting
         self.id = id
-        self.conn.send(str(id).encode('utf-8'))
+        options = {} if map_id is None else {"map": map_id}
+        if protocol == "text":
+            self.conn.send(encode_hello(id, **options))
+        else:
+            self.conn.send(encode_hello(id, proto=protocol, **options))
         ready = self.conn.recv(1024).decode('utf-8')
         if ready != "go":
             print("Server not ready")
@@ -44,14 +73,13 @@ class CarClient(gym.Env):
 
     def step(self, action):
         #print("Client {} step Iteration :".format(self.id))
-
-
-        steering_action = action[0]  # steering value between -1 and 1
-        throttle_action = action[1]  # throttle value between -1 and 1
-        action_packet = f"s{steering_action:.2f}t{throttle_action:.2f}"
+        if self.protocol == "binary":
+            self.conn.sendall(encode_action(action))
+            record = decode_records(MSG_STEP, self.receive(MSG_STEP))[0]
+            return record["obs"].copy(), float(record["reward"]), bool(record["terminated"]), False, {}
 
         # Send Action To Server
-        self.conn.send(action_packet.encode('utf-8'))
+        self.conn.send(encode_action_packet(action))
 
         # Wait for answer
         #print("Client {} STEP WAIT. Iteration :".format(self.id))
@@ -60,15 +88,7 @@ class CarClient(gym.Env):
         #print(iteration)
         answer = self.conn.recv(1024).decode('utf-8')
         # print("Client {} received: {}".format(self.id, answer))
-        match = re.finditer(ACTION_PACKET_REGEX, answer).__next__()
-
-        radars = [float(x) for x in match.group(1).split(',')]
-        obs = np.array([0, 0, 0, 0, 0], dtype=np.float32)
-        for i, radar in enumerate(radars):
-            obs[i] = radar / CarServer.RADAR_MAX_LENGTH
-
-        reward = float(match.group(3))
-        terminated = bool(int(match.group(4)))
+        obs, reward, terminated = decode_step_packet(answer)
 
         #print("Client {} STEP RECEIVED".format(self.id))
         #print(terminated)
@@ -79,6 +99,11 @@ class CarClient(gym.Env):
 
     def reset(self, **kwargs):
         #print("Client {} reset".format(self.id))
+        if self.protocol == "binary":
+            self.conn.sendall(encode_reset())
+            record = decode_records(MSG_OBSERVATION, self.receive(MSG_OBSERVATION))[0]
+            return record["obs"].copy(), {}
+
         # Send Reset Packet To Server
         self.conn.send("r".encode('utf-8'))
 
@@ -90,16 +115,55 @@ class CarClient(gym.Env):
 
         answer = self.conn.recv(1024).decode('utf-8')
         # print("Client {} received: {}".format(self.id, answer))
-        match = re.finditer(RESET_PACKET_REGEX, answer).__next__()
-        radars = [float(x) for x in match.group(1).split(',')]
-        obs = np.array([0, 0, 0, 0, 0], dtype=np.float32)
-        for i, radar in enumerate(radars):
-            obs[i] = radar / CarServer.RADAR_MAX_LENGTH
+        obs = decode_reset_packet(answer)
 
         #print("Client {} RECEIVED RESET".format(self.id))
 
         return obs, {}
 
+    def receive(self, message_type):
+        # Payload Of The Next Binary Message, Which Must Be Of The Given Type
+        message = recv_message(self.conn, self.reader)
+        if message is None:
+            raise ConnectionError("Client {}: Server closed the connection".format(self.id))
+        if message[0] != message_type:
+            raise ConnectionError("Client {}: Unexpected message type {}".format(self.id, message[0]))
+        return message[1]
+
     def close(self):
         self.conn.close()
-        sys.exit(0)
\ No newline at end of file
+        sys.exit(0)
+
+
+class SharedCarClient(gym.Env):
+    """
+    Same environment as CarClient, talking to a RaceServer of the same host
+    through a SharedTransport (see Main) instead of a socket.
+    """
+    metadata = {'render.modes': ['human']}
+
+    def __init__(self, transport, id=0):
+        super(SharedCarClient, self).__init__()
+
+        # Same Spaces As CarClient
+        self.action_space = spaces.Box(low=-1, high=1, shape=[2], dtype=np.float32)
+        self.observation_space = spaces.Box(low=0, high=1, shape=[5], dtype=np.float32)
+
+        # The Id Is The Slot Of This Car In The Transport
+        # The Hello Is Answered When The Race Starts
+        self.transport = transport
+        self.id = id
+        self.transport.request(self.id, COMMAND_HELLO)
+
+    def step(self, action):
+        record = self.transport.request(self.id, COMMAND_STEP, action)
+        return record["obs"].copy(), float(record["reward"]), bool(record["terminated"]), False, {}
+
+    def reset(self, **kwargs):
+        record = self.transport.request(self.id, COMMAND_RESET)
+        return record["obs"].copy(), {}
+
+    def close(self):
+        self.transport.request(self.id, COMMAND_CLOSE)
+        if not self.transport.owner:
+            self.transport.close()  # Detach This Process, The Creator Unlinks The Block
@@ -1,22 +1,20 @@
 import math
 import re
-from typing import Iterator
+import time
 
-import pygame
+import numpy as np
 
-ACTION_PACKET_REGEX = re.compile("^s(-?[01]\.\d+)t(-?[01]\.\d+)$")
-
-BORDER_COLOR = (255, 255, 255, 255)  # Color To Crash on Hit
-
-SECTOR1_COLOR = (0, 0, 255, 255)
-SECTOR2_COLOR = (0, 255, 0, 255)
-SECTOR3_COLOR = (255, 0, 0, 255)
+from Collision import COLLISION_MODES, sweep_segments
+from Constants import CAR_SIZE_X, CAR_SIZE_Y, RADAR_MAX_LENGTH, WIDTH
+from Geometry import RADAR_DEGREES, car_directions
+from Protocol import (MSG_ACTION, MSG_RESET, MessageReader, ProtocolError, decode_records, encode_observation,
+                      encode_step)
+from Radar import RADAR_ENGINES
+from SharedTransport import COMMAND_CLOSE, COMMAND_HELLO, COMMAND_NONE, COMMAND_RESET
+from Sprites import draw_radar
+from TrackMap import BORDER, SECTOR1, SECTOR2, SECTOR3, OUT_OF_BOUNDS, RADAR_STOPS
 
-WIDTH = 1920
-HEIGHT = 1080
-
-CAR_SIZE_X = 60
-CAR_SIZE_Y = 60
+ACTION_PACKET_REGEX = re.compile("^s(-?[01]\.\d+)t(-?[01]\.\d+)$")
 
 MIN_SPEED = 10
 MAX_SPEED = 40
@@ -24,26 +22,65 @@ MAX_SPEED = 40
 MAX_THROTTLE = 15
 MAX_STEERING = 8
 
-RADAR_MAX_LENGTH = 300
+START_POSITION = (830, 920)
+
+
+def encode_step_packet(obs, reward, terminated):
+    return str.encode("o" + ",".join(str(dist) for dist in obs)
+                      + "r" + f"{reward:.2f}"
+                      + "t" + str(int(terminated)))
+
+
+def encode_reset_packet(obs):
+    return str.encode("o" + ",".join(str(dist) for dist in obs))
+
+
+def decode_action_packet(packet):
+    # [steering, throttle] Or None If The Packet Is Invalid
+    match = ACTION_PACKET_REGEX.match(packet)
+    if match is None:
+        return None
+    return [float(match.group(1)), float(match.group(2))]
+
 
 class CarServer:
 
-    def __init__(self, car_id, conn, addr, screen, SPRITE, MAP):
+    def __init__(self, car_id, conn, addr, screen, SPRITES, TRACK, radar_engine="march", world=None, slot=None,
+                 protocol="text", profiler=None, collision="corners"):
         # Socket Connection to AI Client
         self.car_id = car_id
         self.conn = conn
         self.addr = addr
         self.isConnected = True
+        self.protocol = protocol  # "text" Packets, "binary" Frames (See Protocol) Or "shared" Memory (See SharedTransport)
+        self.reader = MessageReader()
+        self.steps = 0  # Actions Served Since Connection
 
         self.screen = screen
-        # Load Car Sprite and Rotate
-        self.SPRITE = SPRITE
-        self.MAP = MAP
-        self.rotated_sprite = SPRITE
+        # Shared Pre-Rotated Car Sprites (See Sprites), Only Used When Drawing
+        self.SPRITES = SPRITES
+        self.TRACK = TRACK  # Label Grid Of The Map (See TrackMap)
+        self.radar_engine = radar_engine
+        self.cast_ray = RADAR_ENGINES[radar_engine]
+
+        # "corners" Or "swept" (See Collision), impact Is The Time Of Impact Of The Last Step
+        if collision not in COLLISION_MODES:
+            raise ValueError("Unknown collision mode: '{}'".format(collision))
+        self.collision = collision
+        self.impact = 1.0
+
+        # When A RaceWorld Is Given, The Physics Of This Car Live In Its Arrays At Index `slot`
+        # And This Object Only Handles The Connection
+        self.world = world
+        self.slot = slot
+
+        # Times The Radars And The Reward When Given (See PhaseProfiler)
+        self.profiler = profiler
 
         # Starting Position
-        self.position = [830, 920]
+        self.position = list(START_POSITION)
         self.angle = 0
+        self.directions = car_directions(0)  # Heading, Corners And Radars Of The Angle (See Geometry)
         self.speed = 0
         self.speed_set = False  # Flag For Default Speed Later on
 
@@ -66,59 +103,171 @@ class CarServer:
         self.distReward = 0
 
     def step(self):
-        #print("Server Car {} step".format(self.car_id))
         # Receive Action From Client
-        # print("Server Car {} WAIT".format(self.car_id))
-        action = 'r'
-        while (action == 'r'):
+        action = self.receive_action()
+        if action is None:
+            return
 
-            action = self.conn.recv(1024)
-            if action == 0:
-                print('deconnected')
-                self.conn.close()
-                self.isConnected = False
-                return
-            action = action.decode('utf-8')
-            # print("Server Car {} received: {}".format(self.car_id, action))
+        # Execute action
+        self.action(action)
 
-            if action == "r":
-                self.reset()
-            else:
-                try:
-                    match: Iterator = re.finditer(ACTION_PACKET_REGEX, action).__next__()
-                except StopIteration:
-                    print("Server Car {}: Invalid action packet received: '{}'".format(self.car_id, action))
-
-                steering = float(match.group(1))
-                throttle = float(match.group(2))
+        # Update car state
+        self.update()
 
-                # Execute action
-                self.action([steering, throttle])
+        # Send data to client
+        self.send_step()
+
+    def receive_action(self):
+        # Wait For The Next Action, Serving Reset Requests Meanwhile
+        # Returns None If The Client Is Gone
+        while self.isConnected:
+            action = self.poll_action()
+            if action is not None:
+                return action
+        return None
+
+    def poll_action(self):
+        # Read Once From The Socket (Only Blocks If Nothing Is Buffered Nor Readable)
+        # Serves A Reset Request, Returns The Action Or None If There Is None Yet
+        if self.protocol == "binary":
+            try:
+                action = self.receive_binary_packet()
+            except ProtocolError as error:
+                # A Malformed Frame Only Drops This Client, Not The Race
+                print("Server Car {}: {}".format(self.car_id, error))
+                self.disconnect()
+                return None
+        elif self.protocol == "shared":
+            action = self.receive_shared_command()
+        else:
+            action = self.receive_text_packet()
+
+        if action == "r":
+            self.reset()
+            return None
+        return action
+
+    def receive_text_packet(self):
+        # Returns "r", [steering, throttle] Or None
+        packet = self.conn.recv(1024)
+        if not packet:
+            print('deconnected')
+            self.disconnect()
+            return None
+        packet = packet.decode('utf-8')
+
+        if packet == "r":
+            return packet
+
+        action = decode_action_packet(packet)
+        if action is None:
+            print("Server Car {}: Invalid action packet received: '{}'".format(self.car_id, packet))
+            self.disconnect()
+            return None
+        return action
+
+    def receive_binary_packet(self):
+        # Returns "r", [steering, throttle] Or None (Also While A Frame Is Incomplete)
+        message = self.reader.next_message()
+        if message is None:
+            data = self.conn.recv(65536)
+            if not data:
+                print('deconnected')
+                self.disconnect()
+                return None
+            self.reader.feed(data)
+            message = self.reader.next_message()
+            if message is None:
+                return None
+        message_type, payload = message
+
+        if message_type == MSG_RESET:
+            return "r"
+
+        if message_type != MSG_ACTION:
+            print("Server Car {}: Unexpected message type received: {}".format(self.car_id, message_type))
+            self.disconnect()
+            return None
+
+        actions = decode_records(MSG_ACTION, payload)
+        if len(actions) != 1:
+            raise ProtocolError("{} actions received for one car".format(len(actions)))
+        return [float(actions[0]["steering"]), float(actions[0]["throttle"])]
+
+    def receive_shared_command(self):
+        # Returns "r", [steering, throttle] Or None (Also While No Command Is Pending)
+        # Here The Connection Is A SharedSlot, Which Never Blocks
+        command, action = self.conn.receive()
+        if command in (COMMAND_NONE, COMMAND_HELLO):
+            return None
+
+        if command == COMMAND_RESET:
+            return "r"
+
+        if command == COMMAND_CLOSE:
+            print('deconnected')
+            self.disconnect()
+            return None
+
+        return action
+
+    def send_go(self):
+        if self.protocol == "shared":
+            self.conn.answer()
+        else:
+            self.conn.send("go".encode('utf-8'))
+
+    def send_step(self):
+        # Get return data
+        if self.world is None:
+            obs = [radar[1] for radar in self.radars]
+            if self.profiler is not None:
+                start = time.perf_counter()
+                reward = self.get_reward()
+                self.profiler.record("reward", start, self.car_id)
+            else:
+                reward = self.get_reward()
+            terminated = not self.is_alive()
+        else:
+            obs = self.world.radar_dist[self.slot]
+            reward = self.world.reward[self.slot]
+            terminated = not self.world.alive[self.slot]
+
+        if self.protocol == "binary":
+            self.conn.sendall(encode_step(np.asarray(obs) / RADAR_MAX_LENGTH, reward, terminated))
+        elif self.protocol == "shared":
+            self.conn.answer(np.asarray(obs) / RADAR_MAX_LENGTH, reward, terminated)
+        else:
+            self.conn.sendall(encode_step_packet(obs, reward, terminated))
 
-                # Update car state
-                self.update()
+    def send_reset(self):
+        if self.world is None:
+            obs = [radar[1] for radar in self.radars]
+        else:
+            obs = self.world.radar_dist[self.slot]
 
-                # Get return data
-                obs = self.radars
-                reward = self.get_reward()
-                terminated = not self.is_alive()
+        if self.protocol == "binary":
+            self.conn.sendall(encode_observation(np.asarray(obs) / RADAR_MAX_LENGTH))
+        elif self.protocol == "shared":
+            self.conn.answer(np.asarray(obs) / RADAR_MAX_LENGTH)
+        else:
+            self.conn.sendall(encode_reset_packet(obs))
 
-                # Send data to client
-                self.conn.sendall(str.encode("o" + str(obs[0][1])
-                                             + "," + str(obs[1][1])
-                                             + "," + str(obs[2][1])
-                                             + "," + str(obs[3][1])
-                                             + "," + str(obs[4][1])
-                                             + "r" + f"{reward:.2f}"
-                                             + "t" + str(int(terminated))))
+    def disconnect(self):
+        self.conn.close()
+        self.isConnected = False
 
     def reset(self):
         #print("Server Car {} RESET".format(self.car_id))
-        self.rotated_sprite = self.SPRITE
+        if self.world is not None:
+            self.world.reset(self.slot)
+            self.send_reset()
+            return
 
         # Starting Position
-        self.position = [830, 920]
+        self.position = list(START_POSITION)
         self.angle = 0
+        self.directions = car_directions(0)  # The Swept Corners Of The Next Step Start From This Pose
         self.speed = 0
         self.speed_set = False  # Flag For Default Speed Later on
 
@@ -142,14 +291,9 @@ class CarServer:
 
         # Run first tick
         self.update()
-        obs = self.radars
 
         # Send data to client
-        self.conn.sendall(str.encode("o" + str(obs[0][1])
-                                     + "," + str(obs[1][1])
-                                     + "," + str(obs[2][1])
-                                     + "," + str(obs[3][1])
-                                     + "," + str(obs[4][1])))
+        self.send_reset()
 
     def action(self, action):
         steering_action = action[0]  # steering value between -1 and 1
@@ -170,10 +314,16 @@ class CarServer:
             self.speed = MIN_SPEED
             self.speed_set = True
 
-        # Get Rotated Sprite And Move Into The Right X-Direction
+        # Corners Before Moving, Swept Towards The New Ones
+        previous = self.calculate_corners() if self.collision == "swept" else None
+
+        # Directions Of The Current Angle (See Geometry)
+        self.directions = car_directions(self.angle)
+        heading = self.directions[0]
+
+        # Move Into The Right X-Direction
         # Don't Let The Car Go Closer Than 20px To The Edge
-        self.rotated_sprite = self.rotate_center(self.SPRITE, self.angle)
-        self.position[0] += math.cos(math.radians(360 - self.angle)) * self.speed
+        self.position[0] += heading[0] * self.speed
         self.position[0] = max(self.position[0], 20)
         self.position[0] = min(self.position[0], WIDTH - 120)
 
@@ -182,22 +332,24 @@ class CarServer:
         self.time += 1
 
         # Same For Y-Position
-        self.position[1] += math.sin(math.radians(360 - self.angle)) * self.speed
+        self.position[1] += heading[1] * self.speed
         self.position[1] = max(self.position[1], 20)
         self.position[1] = min(self.position[1], WIDTH - 120)
 
         # Calculate New Center
         self.center = [int(self.position[0]) + CAR_SIZE_X / 2, int(self.position[1]) + CAR_SIZE_Y / 2]
 
-        self.calculate_corners()
-
         # Check Collisions And Clear Radars
-        self.check_collision()
+        self.check_collision(previous)
         self.radars.clear()
 
         # From -90 To 120 With Step-Size 45 Check Radar
-        for d in range(-90, 120, 45):
-            self.check_radar(d)
+        if self.profiler is not None:
+            start = time.perf_counter()
+        for r, d in enumerate(RADAR_DEGREES):
+            self.check_radar(d, self.directions[2][r])
+        if self.profiler is not None:
+            self.profiler.record("radar", start, self.car_id)
 
     def is_alive(self):
         # Basic Alive Function
@@ -220,86 +372,67 @@ class CarServer:
 
         return result
 
-    def rotate_center(self, image, angle):
-        # Rotate The Rectangle
-        rectangle = image.get_rect()
-        rotated_image = pygame.transform.rotate(image, angle)
-        rotated_rectangle = rectangle.copy()
-        rotated_rectangle.center = rotated_image.get_rect().center
-        rotated_image = rotated_image.subsurface(rotated_rectangle).copy()
-        return rotated_image
-
     def calculate_corners(self):
         # Calculate Four Corners
         # Length Is Half The Side
         length = 0.5 * CAR_SIZE_X
-        left_top = [self.center[0] + math.cos(math.radians(360 - (self.angle + 30))) * length,
-                    self.center[1] + math.sin(math.radians(360 - (self.angle + 30))) * length]
-        right_top = [self.center[0] + math.cos(math.radians(360 - (self.angle + 150))) * length,
-                     self.center[1] + math.sin(math.radians(360 - (self.angle + 150))) * length]
-        left_bottom = [self.center[0] + math.cos(math.radians(360 - (self.angle + 210))) * length,
-                       self.center[1] + math.sin(math.radians(360 - (self.angle + 210))) * length]
-        right_bottom = [self.center[0] + math.cos(math.radians(360 - (self.angle + 330))) * length,
-                        self.center[1] + math.sin(math.radians(360 - (self.angle + 330))) * length]
-        return [left_top, right_top, left_bottom, right_bottom]
-
-    def check_radar(self, degree):
-        length = 0
-        x = int(self.center[0] + math.cos(math.radians(360 - (self.angle + degree))) * length)
-        y = int(self.center[1] + math.sin(math.radians(360 - (self.angle + degree))) * length)
-
-        # While We Don't Hit BORDER_COLOR AND length < 300 (just a max) -> go further and further
-        # while not self.MAP.get_at((x, y)) == BORDER_COLOR and length < RADAR_MAX_LENGTH:
-        #     length = length + 1
-        #     x = int(self.center[0] + math.cos(math.radians(360 - (self.angle + degree))) * length)
-        #     y = int(self.center[1] + math.sin(math.radians(360 - (self.angle + degree))) * length)
-
-        while 0 <= x < self.MAP.get_width() and 0 <= y < self.MAP.get_height() and (
-                self.MAP.get_at((x, y)) != BORDER_COLOR and
-                self.MAP.get_at((x, y)) != SECTOR1_COLOR and
-                self.MAP.get_at((x, y)) != SECTOR2_COLOR and
-                self.MAP.get_at((x, y)) != SECTOR3_COLOR) and length < RADAR_MAX_LENGTH:
-
-            length = length + 1
-            x = int(self.center[0] + math.cos(math.radians(360 - (self.angle + degree))) * length)
-            y = int(self.center[1] + math.sin(math.radians(360 - (self.angle + degree))) * length)
-
-            new_sector = 0
-            if self.MAP.get_at((x, y)) == SECTOR1_COLOR:
-                if self.current_sector == 2:
-                    new_sector = 1
-                self.current_sector = 1
-            if self.MAP.get_at((x, y)) == SECTOR2_COLOR:
-                if self.current_sector == 3:
-                    new_sector = 1
-                self.current_sector = 2
-            if self.MAP.get_at((x, y)) == SECTOR3_COLOR:
-                if self.current_sector == 1:
-                    new_sector = 1
-                    self.turnCount += 1
-                self.current_sector = 3
-
-            if new_sector:
-                self.sectorReward += self.current_sector * 1000 / (self.time / self.turnCount)
+        cx, cy = self.center
+        return [[cx + dx * length, cy + dy * length] for dx, dy in self.directions[1]]
+
+    def check_radar(self, degree, direction=None):
+        # Go Further And Further Until We Hit A Border Or Sector Line Or length == 300 (just a max)
+        x, y, label, length = self.cast_ray(self.TRACK, self.center[0], self.center[1],
+                                            360 - (self.angle + degree), RADAR_MAX_LENGTH, RADAR_STOPS,
+                                            direction=direction)
+
+        # Only The Last Pixel Of The Ray Can Be A Sector Line
+        if length > 0:
+            self.check_sector(label)
 
         # Calculate Distance To Border And Append To Radars List
         dist = int(math.sqrt(math.pow(x - self.center[0], 2) + math.pow(y - self.center[1], 2)))
         self.radars.append([(x, y), dist])
 
-    def check_collision(self):
+    def check_sector(self, label):
+        new_sector = 0
+        if label == SECTOR1:
+            if self.current_sector == 2:
+                new_sector = 1
+            self.current_sector = 1
+        if label == SECTOR2:
+            if self.current_sector == 3:
+                new_sector = 1
+            self.current_sector = 2
+        if label == SECTOR3:
+            if self.current_sector == 1:
+                new_sector = 1
+                self.turnCount += 1
+            self.current_sector = 3
+
+        if new_sector:
+            self.sectorReward += self.current_sector * 1000 / (self.time / self.turnCount)
+
+    def check_collision(self, previous=None):
         self.alive = True
+        self.impact = 1.0
         corners = self.calculate_corners()
+        if previous is not None:
+            # Swept: The First Border Pixel Crossed By A Corner During The Step
+            self.impact = float(sweep_segments(self.TRACK, previous, corners, self.radar_engine).min())
+            if self.impact < 1:
+                self.alive = False
+                return
         for point in corners:
-            # If Any Corner Touches Border Color -> Crash
+            # If Any Corner Touches Border Color (Or Leaves The Map) -> Crash
             # Assumes Rectangle
-            if self.MAP.get_at((int(point[0]), int(point[1]))) == BORDER_COLOR:
+            if self.TRACK.label_at(int(point[0]), int(point[1])) in (BORDER, OUT_OF_BOUNDS):
                 self.alive = False
                 break
 
-    def draw(self):
-        self.screen.blit(self.rotated_sprite, self.position)  # Draw Sprite
+    def draw(self, radars=True):
+        # Returns The Rectangles Drawn Over
+        rects = [self.screen.blit(self.SPRITES.rotated(self.angle), self.position)]  # Draw Sprite
         # Optionally Draw All Sensors / Radars
-        for radar in self.radars:
-            position = radar[0]
-            pygame.draw.line(self.screen, (0, 255, 0), self.center, position, 1)
-            pygame.draw.circle(self.screen, (0, 255, 0), position, 5)
+        if radars:
+            rects.extend(draw_radar(self.screen, self.center, radar[0]) for radar in self.radars)
+        return rects
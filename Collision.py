@@ -0,0 +1,40 @@
+import numpy as np
+
+from Radar import cast_rays
+from TrackMap import BORDER, OUT_OF_BOUNDS
+
+# Labels A Car Crashes On
+CRASH_STOPS = frozenset((BORDER, OUT_OF_BOUNDS))
+
+# Collision Modes Of CarServer And RaceWorld
+#  - corners: The Four Corners Of The Car At The End Of The Step (Reference)
+#  - swept:   Also Every Pixel Each Corner Crossed From The Previous Pose, So A Fast Car
+#             Can't Jump Over A Thin Border Between Two Ticks
+COLLISION_MODES = ("corners", "swept")
+
+
+def sweep_segments(track, start, end, engine="sphere"):
+    """
+    Time of impact of points moving in a straight line from `start` to
+    `end` (arrays of shape (N, 2)): the fraction of the move done when the
+    point first lands on a pixel in CRASH_STOPS, 1 when it never does.
+
+    Every segment is cast as a radar ray (see Radar.cast_rays), sampled at
+    every integer length up to the end of the segment, so a segment misses
+    a border exactly when a radar along it would. The end point itself is
+    left to the corner check.
+    """
+    start = np.asarray(start, dtype=np.float64).reshape(-1, 2)
+    end = np.asarray(end, dtype=np.float64).reshape(-1, 2)
+    delta = end - start
+    length = np.hypot(delta[:, 0], delta[:, 1])
+    moved = length > 0
+    dx = np.divide(delta[:, 0], length, out=np.zeros(len(length)), where=moved)
+    dy = np.divide(delta[:, 1], length, out=np.zeros(len(length)), where=moved)
+
+    # Rays Shorter Than The Longest Segment Stop Beyond Their Own End: Only Hits Within It Count
+    max_length = int(np.floor(length.max())) if len(length) else 0
+    _, _, label, hit = cast_rays(track, start[:, 0], start[:, 1], np.zeros(len(length)), max_length, CRASH_STOPS,
+                                 engine, (dx, dy))
+    crashed = np.isin(label, list(CRASH_STOPS)) & (hit <= length)
+    return np.where(crashed, np.divide(hit, length, out=np.zeros(len(length)), where=moved), 1.0)
@@ -0,0 +1,20 @@
+# Values Shared By The Race Server And Its Clients
+# Imports Nothing: Client Processes Read These Without Loading pygame Or The Server
+
+# Network
+SERVER_HOST = "0.0.0.0"  # Address The Race Server Listens On
+HOST = "127.0.0.1"  # Address The Clients Connect To
+PORT = 1236
+CONNECT_TIMEOUT = 30  # Seconds A Client Waits For The Race Server To Listen
+
+# Window
+WIDTH = 1920
+HEIGHT = 1080
+
+# Cars
+CAR_SIZE_X = 60
+CAR_SIZE_Y = 60
+
+# Radars, Observations Are Distances Divided By RADAR_MAX_LENGTH
+NB_RADARS = 5
+RADAR_MAX_LENGTH = 300
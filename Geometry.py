@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+
+# Trigonometry Lookup Tables For The Car Geometry
+#
+# Car angles are looked up in ANGLE_BINS bins of ANGLE_STEP degrees. ANGLE_STEP is
+# MAX_STEERING / 100, the steering resolution of the text protocol (two decimals),
+# and divides the NEAT steering (10 degrees) exactly. Continuous steering (binary and
+# shared protocols, RaceVecEnv, CarBatchClient) leaves the angle between two bins: the
+# directions of such an angle are computed exactly instead (see car_directions, directions).
+# Every table holds the (cos, sin) of 360 - (angle + degree), the direction used by
+# CarServer for its heading, its corners and its radars, as NumPy arrays for RaceWorld
+# and as nested tuples for the scalar code.
+# The tables cover one turn: a negative angle or one past 360 degrees gets the directions
+# of the same angle within the turn, which differ from math.cos / math.sin of the raw
+# angle in the last bits (below 1e-14), so long NEAT runs are not bit-identical.
+
+ANGLE_BINS = 4500
+ANGLE_STEP = 360 / ANGLE_BINS  # 0.08 Degree
+
+HEADING_DEGREES = (0,)
+CORNER_DEGREES = (30, 150, 210, 330)
+RADAR_DEGREES = (-90, -45, 0, 45, 90)
+
+# Angles Closer Than This (In Bins) To Their Bin Are On It: Sums Of Two Decimal Steerings Drift By Far Less
+BIN_TOLERANCE = 1e-6
+
+
+def angle_index(angle):
+    # Bin Of A Scalar Angle (Any Number Of Turns, Negative Included)
+    return round(angle / ANGLE_STEP) % ANGLE_BINS
+
+
+def angle_indices(angles):
+    # Bins Of An Array Of Angles, Same Rounding As angle_index
+    return np.rint(np.asarray(angles) / ANGLE_STEP).astype(np.int64) % ANGLE_BINS
+
+
+def on_bins(angles):
+    # Whether Every Angle Is On Its Bin, Its Directions Then Being The Rows Of The Tables
+    bins = np.asarray(angles) / ANGLE_STEP
+    return np.abs(bins - np.rint(bins)) <= BIN_TOLERANCE
+
+
+def direction_table(degrees):
+    # Shape (ANGLE_BINS, len(degrees), 2)
+    angles = np.arange(ANGLE_BINS)[:, np.newaxis] * 360 / ANGLE_BINS + np.asarray(degrees)
+    radians = np.radians(360 - angles)
+    return np.stack((np.cos(radians), np.sin(radians)), axis=-1)
+
+
+def as_tuples(table):
+    return tuple(tuple(tuple(direction) for direction in row) for row in table.tolist())
+
+
+HEADING_TABLE = direction_table(HEADING_DEGREES)[:, 0]
+CORNER_TABLE = direction_table(CORNER_DEGREES)
+RADAR_TABLE = direction_table(RADAR_DEGREES)
+
+HEADINGS = tuple(tuple(direction) for direction in HEADING_TABLE.tolist())
+CORNERS = as_tuples(CORNER_TABLE)
+RADARS = as_tuples(RADAR_TABLE)
+
+
+# (cos, sin) Of Every Degree Of The Corners And Radars, To Rotate The Heading Of An Angle Off Its Bin
+CORNER_OFFSETS = tuple((math.cos(math.radians(degree)), math.sin(math.radians(degree))) for degree in CORNER_DEGREES)
+RADAR_OFFSETS = tuple((math.cos(math.radians(degree)), math.sin(math.radians(degree))) for degree in RADAR_DEGREES)
+
+
+def car_directions(angle):
+    # (Heading, Corners, Radars) Of A Scalar Angle, Looked Up When It Is On Its Bin
+    # Pure Python: Called Every Tick Of Every CarServer, Where NumPy Scalars Cost More Than The Trigonometry
+    angle = float(angle)
+    bins = angle / ANGLE_STEP
+    index = round(bins)
+    if abs(bins - index) <= BIN_TOLERANCE:
+        index %= ANGLE_BINS
+        return HEADINGS[index], CORNERS[index], RADARS[index]
+
+    # Off Its Bin: The Heading Rotated By Every Degree, cos(h - d) And sin(h - d)
+    radian = math.radians(360 - angle)
+    cos, sin = math.cos(radian), math.sin(radian)
+    return ((cos, sin), [(cos * dc + sin * ds, sin * dc - cos * ds) for dc, ds in CORNER_OFFSETS],
+            [(cos * dc + sin * ds, sin * dc - cos * ds) for dc, ds in RADAR_OFFSETS])
+
+
+def directions(table, degrees, angles):
+    # Rows Of `table` (Built From `degrees`) For An Array Of Angles, Computed For The Angles Off Their Bin
+    angles = np.asarray(angles, dtype=np.float64)
+    rows = table[angle_indices(angles)]
+    off = ~on_bins(angles)
+    if np.any(off):
+        radians = np.radians(360 - (angles[off, np.newaxis] + np.asarray(degrees)))
+        rows[off] = np.stack((np.cos(radians), np.sin(radians)), axis=-1).reshape(rows[off].shape)
+    return rows
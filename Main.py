@@ -1,31 +1,82 @@
+import multiprocessing
+import sys
 import threading
+import time
 
 import gymnasium as gym
-from stable_baselines3.common.env_checker import check_env
-from stable_baselines3 import DQN, A2C, PPO
 from typing import Callable
 
-from stable_baselines3.common.utils import set_random_seed
-from stable_baselines3.common.vec_env import SubprocVecEnv
-from stable_baselines3.common.logger import configure
+# Training Workers Import This Module When They Start: Only The Client Side Is Imported Here,
+# The Learning Library And The Server Are Imported By The Functions Using Them
+from CarClient import CarClient, SharedCarClient
+from Constants import PORT
+from SharedTransport import SharedTransport
 
-from CarClient import CarClient
-from RaceServer import RaceServer
+# Imported Once By The Fork Server The Training Workers Are Forked From: This Module And The SB3 Worker Loop
+WORKER_PRELOAD = ["__main__", "stable_baselines3.common.vec_env.subproc_vec_env"]
 
 
-def make_env(rank: int, seed: int = 0) -> Callable:
+def make_env(rank: int, seed: int = 0, protocol: str = "text", transport: SharedTransport = None,
+             port: int = PORT) -> Callable:
+    from stable_baselines3.common.utils import set_random_seed
 
     def _init() -> gym.Env:
-        env = CarClient(rank)
+        if transport is not None:
+            env = SharedCarClient(transport, rank)
+        else:
+            env = CarClient(rank, protocol, port=port)
         env.reset(seed=seed + rank)
         return env
 
     set_random_seed(seed)
     return _init
 
-def train_multiproccess(algo, nb_model_map, num_cpu=2):
+def make_vec_env(num_cpu, protocol="text", transport=None, shards=None):
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+
+    # A Shared Transport Is Handed To The Workers When They Start, With Its Own Start Method
+    # SB3 Starts Its Workers With The Fork Server When There Is One
+    start_method = transport.start_method if transport is not None else None
+    if start_method in (None, "forkserver") and "forkserver" in multiprocessing.get_all_start_methods():
+        multiprocessing.set_forkserver_preload(WORKER_PRELOAD)
+    # With Shards, Every Worker Connects To The Server Process Simulating Its Car (See RaceShards)
+    ports = [PORT if shards is None else shards.address(i)[1] for i in range(num_cpu)]
+    return SubprocVecEnv([make_env(i, protocol=protocol, transport=transport, port=ports[i]) for i in range(num_cpu)],
+                         start_method=start_method)
+
+def train_multiproccess(algo, nb_model_map, num_cpu=2, protocol="text", transport=None, shards=None):
+    from stable_baselines3 import A2C, PPO
+
     # Multi-processing
-    car = SubprocVecEnv([make_env(i) for i in range(num_cpu)])
+    car = make_vec_env(num_cpu, protocol, transport, shards)
+    match algo:
+        case "PPO":
+            PPOmodel = PPO("MlpPolicy", car).learn(total_timesteps=900000)
+            PPOmodel.save('./modelPPO/map{}'.format(nb_model_map))
+        case "A2C":
+            A2Cmodel = A2C("MlpPolicy", car).learn(total_timesteps=500000)
+            A2Cmodel.save('./modelA2C/map{}'.format(nb_model_map))
+
+def train_inprocess(algo, nb_model_map, num_envs=2):
+    from stable_baselines3 import A2C, PPO
+    from RaceVecEnv import RaceVecEnv
+
+    # All Cars Simulated In This Process, No Race Server Needed
+    car = RaceVecEnv(num_envs, nb_model_map)
+    match algo:
+        case "PPO":
+            PPOmodel = PPO("MlpPolicy", car).learn(total_timesteps=900000)
+            PPOmodel.save('./modelPPO/map{}'.format(nb_model_map))
+        case "A2C":
+            A2Cmodel = A2C("MlpPolicy", car).learn(total_timesteps=500000)
+            A2Cmodel.save('./modelA2C/map{}'.format(nb_model_map))
+
+def train_batched(algo, nb_model_map, num_envs=2):
+    from stable_baselines3 import A2C, PPO
+    from CarBatchClient import CarBatchClient
+
+    # Every Car Driven By This Process Through One Connection To The Race Server
+    car = CarBatchClient(num_envs)
     match algo:
         case "PPO":
             PPOmodel = PPO("MlpPolicy", car).learn(total_timesteps=900000)
@@ -34,8 +85,11 @@ def train_multiproccess(algo, nb_model_map, num_cpu=2):
             A2Cmodel = A2C("MlpPolicy", car).learn(total_timesteps=500000)
             A2Cmodel.save('./modelA2C/map{}'.format(nb_model_map))
 
-def train_monoproccess(algo, nb_model_map):
-    car = CarClient()
+def train_monoproccess(algo, nb_model_map, protocol="text", transport=None):
+    from stable_baselines3 import A2C, PPO
+    from stable_baselines3.common.env_checker import check_env
+
+    car = SharedCarClient(transport) if transport is not None else CarClient(protocol=protocol)
     check_env(car)
     match algo:
         case "PPO":
@@ -45,22 +99,58 @@ def train_monoproccess(algo, nb_model_map):
             A2Cmodel = A2C("MlpPolicy", car).learn(total_timesteps=500000)
             A2Cmodel.save('./modelA2C/map{}'.format(nb_model_map))
 
-def thread_race(NB_CARS, NB_MAPS):
-    RaceServer(NB_CARS, NB_MAPS).run()
+def thread_race(NB_CARS, NB_MAPS, HEADLESS=False, TRANSPORT=None, PROFILE=False, RECORD=False, MAPS=None):
+    from PhaseProfiler import PhaseProfiler
+    from RaceRecorder import RaceRecorder
+    from RaceServer import RaceServer
+
+    profiler = PhaseProfiler(path="profile.log") if PROFILE else None
+    recorder = RaceRecorder(time.strftime("recordings/%Y%m%d-%H%M%S")) if RECORD else None
+    RaceServer(NB_CARS, NB_MAPS, headless=HEADLESS, transport=TRANSPORT, profiler=profiler, recorder=recorder,
+               maps=MAPS).run()
 
 if __name__ == '__main__':
 
     NB_CARS = 8
     ID_MAP = 4
     ALGO = "A2C"
+    HEADLESS = False
+    PROTOCOL = "binary"  # "text", "binary" Or "shared" (Shared Memory, Server And Clients On This Host)
+    IN_PROCESS = False
+    BATCHED = False
+    PROFILE = False
+    RECORD = False
+    MAPS = None  # Map Ids Hosted By The Server, e.g. [1, 2, 3, 4]: The Cars Are Spread Over Them
+    SHARDS = 0  # Race Server Processes Sharing The Cars, 0 = One Server Thread In This Process
+
+    if IN_PROCESS:
+        # Train Without Race Server Nor Clients
+        train_inprocess(ALGO, ID_MAP, NB_CARS)
+        sys.exit(0)
+
+    if SHARDS:
+        # Headless Race Servers In Their Own Processes, Each Worker Connected To The Shard Of Its Car
+        from RaceShards import RaceShards
+        if PROTOCOL == "shared":
+            raise ValueError("Shards talk to their clients over sockets: use the text or binary protocol")
+        shards = RaceShards(NB_CARS, SHARDS, ID_MAP, maps=MAPS).start()
+        train_multiproccess(ALGO, ID_MAP, NB_CARS, PROTOCOL, shards=shards)
+        shards.join(timeout=10)
+        sys.exit(0)
+
+    # Shared Memory Mailboxes Replace The Sockets, Created Before The Server And The Workers
+    TRANSPORT = SharedTransport(NB_CARS) if PROTOCOL == "shared" else None
 
     # Start Race Server
-    race = threading.Thread(target=thread_race, args=(NB_CARS, ID_MAP))
+    race = threading.Thread(target=thread_race, args=(NB_CARS, ID_MAP, HEADLESS, TRANSPORT, PROFILE, RECORD, MAPS))
     race.start()
 
     if NB_CARS == 1:
         # Start Training with Mono Client
-        train_monoproccess(ALGO, ID_MAP)
+        train_monoproccess(ALGO, ID_MAP, PROTOCOL, TRANSPORT)
+    elif BATCHED:
+        # Start Training with One Client Driving Every Car
+        train_batched(ALGO, ID_MAP, NB_CARS)
     else:
         # Start Training with AI Clients
-        train_multiproccess(ALGO, ID_MAP, NB_CARS)
+        train_multiproccess(ALGO, ID_MAP, NB_CARS, PROTOCOL, TRANSPORT)
@@ -0,0 +1,127 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from TrackMap import BORDER, OUT_OF_BOUNDS, RADAR_STOPS, TrackMap
+
+# Compiled Maps Are Kept Next To Their PNG, One Directory Per Map Content:
+#   assets/cache/map1-<hash>/map.json, labels.npy, framed_labels.npy And The DISTANCE_FIELDS
+# Plain .npy Files (Not .npz) So Every Process Memory-Maps The Same Pages Read-Only
+CACHE_DIRECTORY = "cache"
+META_FILE = "map.json"
+CACHE_VERSION = 1  # Bump When The Labels Or Fields Change: Older Entries Are Then Compiled Again
+
+# Derived Fields Compiled With Every Map: File -> Stop Labels Of The Distance Field
+DISTANCE_FIELDS = {
+    "distance.npy": RADAR_STOPS,  # Radars Of The Servers
+    "border_distance.npy": (BORDER, OUT_OF_BOUNDS),  # Radars Of The NEAT Cars (Sectors Are Not Walls)
+}
+
+
+def content_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_entry(path, digest=None):
+    # Directory Of The Compiled Map Of The PNG At `path`
+    digest = content_hash(path) if digest is None else digest
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(path), CACHE_DIRECTORY, "{}-{}".format(name, digest[:16]))
+
+
+def read_meta(entry):
+    try:
+        with open(os.path.join(entry, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(meta, digest):
+    return meta is not None and meta["version"] == CACHE_VERSION and meta["sha256"] == digest
+
+
+def compile_map(path, force=False):
+    """
+    Decodes the PNG at `path` into its label grids and derived fields, and
+    writes them to its cache entry, unless an up to date one exists.
+    Returns the directory of the entry.
+    """
+    digest = content_hash(path)
+    entry = cache_entry(path, digest)
+    if not force and is_current(read_meta(entry), digest):
+        return entry
+
+    track = TrackMap.load(path)
+    meta = {
+        "version": CACHE_VERSION,
+        "source": os.path.basename(path),
+        "sha256": digest,
+        "width": track.width,
+        "height": track.height,
+        "fields": {},
+    }
+
+    # Written Aside Then Renamed, So Concurrent Processes Never Read Half An Entry
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".compiling-", dir=os.path.dirname(entry))
+    os.chmod(staging, 0o755)  # mkdtemp Makes It Private
+    np.save(os.path.join(staging, "labels.npy"), track.labels)
+    np.save(os.path.join(staging, "framed_labels.npy"), track.framed_labels)
+    for file, stops in DISTANCE_FIELDS.items():
+        np.save(os.path.join(staging, file), track.distance_field(stops))
+        meta["fields"][file] = sorted(stops)
+    with open(os.path.join(staging, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Another Process May Have Renamed Its Own Copy Into Place Meanwhile: Only A Stale Entry
+    # (Older Version) Is Removed, An Up To Date One Is Used And This Copy Discarded
+    if os.path.isdir(entry):
+        if not force and is_current(read_meta(entry), digest):
+            shutil.rmtree(staging, ignore_errors=True)
+            return entry
+        shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not is_current(read_meta(entry), digest):
+            raise
+    return entry
+
+
+def load_track(path):
+    """
+    TrackMap of the PNG at `path`, with its distance fields, memory-mapped
+    read-only from its cache entry (compiled first if missing or stale).
+    """
+    entry = compile_map(path)
+    meta = read_meta(entry)  # Of The Entry In Place, Whichever Process Compiled It
+
+    def load(file):
+        return np.asarray(np.load(os.path.join(entry, file), mmap_mode="r"))
+
+    track = TrackMap.from_labels(load("labels.npy"), load("framed_labels.npy"))
+    for file, stops in meta["fields"].items():
+        track.set_distance_field(stops, load(file))
+    return track
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile maps into the memory-mapped cache used by every process")
+    parser.add_argument("maps", nargs="*", help="PNG maps to compile, every assets/map*.png if not given")
+    parser.add_argument("--force", action="store_true", help="compile again even if the cache is up to date")
+    args = parser.parse_args()
+
+    for path in args.maps or sorted(glob.glob("assets/map*.png")):
+        start = time.perf_counter()
+        entry = compile_map(path, args.force)
+        print("{} -> {} ({:.2f}s)".format(path, entry, time.perf_counter() - start))
@@ -0,0 +1,125 @@
+import math
+
+import neat
+import numpy as np
+from neat.activations import tanh_activation
+from neat.aggregations import sum_aggregation
+
+# Slots Of The Value Array Of A Network (One Row Per Network)
+ZERO_SLOT = 0  # Always 0.0: Padded Links Read It, Unreachable Outputs Are It
+FIRST_INPUT_SLOT = 1
+
+
+class FeedForwardBatch:
+    """
+    The feed-forward networks of several genomes evaluated together.
+
+    Nodes are grouped by depth (longest path from the inputs). Every depth
+    becomes padded NumPy arrays of sources, weights, biases and responses,
+    with one row per network, so a forward pass of the whole population
+    is one loop over depths and links instead of a Python loop over nodes.
+    Links are summed in the order of neat.nn.FeedForwardNetwork, which
+    gives exactly the same outputs as its activate (up to Python 3.11:
+    later versions compensate rounding errors in sum, then the outputs
+    may differ in their last bits).
+
+    With exact=False, np.tanh replaces math.tanh: several times faster,
+    but outputs may then differ from activate by a few ulps.
+    """
+
+    def __init__(self, nb_inputs, output_slots, layers, nb_slots, exact=True):
+        self.nb_inputs = nb_inputs
+        self.exact = exact
+        self.nb_networks = len(output_slots)
+        self.nb_slots = nb_slots
+
+        # Slots Become Indices In The Flattened Value Array, For take / put
+        rows = np.arange(self.nb_networks)[:, np.newaxis] * nb_slots
+        self.outputs = rows + output_slots  # (networks, outputs)
+        self.layers = [(rows + target, rows[:, :, np.newaxis] + sources, weights, bias, response, real)
+                       for target, sources, weights, bias, response, real in layers]
+
+    @classmethod
+    def create(cls, genomes, config, exact=True):
+        nets = [neat.nn.FeedForwardNetwork.create(genome, config) for genome in genomes]
+        return cls.from_networks(nets, exact)
+
+    @classmethod
+    def from_networks(cls, nets, exact=True):
+        nb_inputs = len(nets[0].input_nodes)
+
+        # Slots And Depths Of Every Node, Network By Network
+        slots = []
+        depths = []
+        for net in nets:
+            slot = {key: FIRST_INPUT_SLOT + i for i, key in enumerate(net.input_nodes)}
+            depth = {key: 0 for key in net.input_nodes}
+            for node, act_func, agg_func, bias, response, links in net.node_evals:
+                if act_func is not tanh_activation or agg_func is not sum_aggregation:
+                    raise ValueError("Only tanh activation and sum aggregation can be batched (node {})".format(node))
+                slot[node] = FIRST_INPUT_SLOT + len(slot)
+                depth[node] = 1 + max((depth[i] for i, _ in links), default=0)
+            slots.append(slot)
+            depths.append(depth)
+
+        nb_slots = FIRST_INPUT_SLOT + nb_inputs + max(len(slot) - nb_inputs for slot in slots) + 1
+        trash_slot = nb_slots - 1  # Written By Padded Nodes, Never Read
+
+        output_slots = np.array([[slot.get(key, ZERO_SLOT) for key in net.output_nodes]
+                                 for net, slot in zip(nets, slots)], dtype=np.int64)
+
+        layers = []
+        max_depth = max((max(depth.values()) for depth in depths), default=0)
+        for d in range(1, max_depth + 1):
+            nodes = [[evaluation for evaluation in net.node_evals if depth[evaluation[0]] == d]
+                     for net, depth in zip(nets, depths)]
+            nb_nodes = max(len(row) for row in nodes)
+            nb_links = max((len(evaluation[5]) for row in nodes for evaluation in row), default=0)
+
+            target = np.full((len(nets), nb_nodes), trash_slot, dtype=np.int64)
+            sources = np.full((len(nets), nb_nodes, nb_links), ZERO_SLOT, dtype=np.int64)
+            weights = np.zeros((len(nets), nb_nodes, nb_links), dtype=np.float64)
+            bias = np.zeros((len(nets), nb_nodes), dtype=np.float64)
+            response = np.ones((len(nets), nb_nodes), dtype=np.float64)
+            real = np.zeros((len(nets), nb_nodes), dtype=bool)
+
+            for n, (row, slot) in enumerate(zip(nodes, slots)):
+                for m, (node, _, _, node_bias, node_response, links) in enumerate(row):
+                    target[n, m] = slot[node]
+                    bias[n, m] = node_bias
+                    response[n, m] = node_response
+                    real[n, m] = True
+                    for k, (i, w) in enumerate(links):
+                        sources[n, m, k] = slot[i]
+                        weights[n, m, k] = w
+
+            layers.append((target, sources, weights, bias, response, real))
+
+        return cls(nb_inputs, output_slots, layers, nb_slots, exact)
+
+    def activate(self, inputs):
+        # inputs: (networks, nb_inputs) -> outputs: (networks, nb_outputs)
+        values = np.zeros((self.nb_networks, self.nb_slots), dtype=np.float64)
+        values[:, FIRST_INPUT_SLOT:FIRST_INPUT_SLOT + self.nb_inputs] = inputs
+
+        for target, sources, weights, bias, response, real in self.layers:
+            # Same Order As sum([values[i] * w for i, w in links]), Padded Links Adding 0.0
+            products = values.take(sources) * weights
+            s = np.zeros(target.shape, dtype=np.float64)
+            for k in range(products.shape[2]):
+                s += products[:, :, k]
+
+            # tanh_activation
+            z = np.minimum(np.maximum(2.5 * (bias + response * s), -60.0), 60.0)
+            if self.exact:
+                activation = np.zeros(target.shape, dtype=np.float64)
+                activation[real] = list(map(math.tanh, z[real].tolist()))
+            else:
+                activation = np.tanh(z)
+            values.put(target, activation)
+
+        return values.take(self.outputs)
+
+    def choices(self, inputs):
+        # Index Of The Largest Output Per Network, First One On Ties (Like output.index(max(output)))
+        return np.argmax(self.activate(inputs), axis=1)
@@ -2,14 +2,24 @@
 # Code Changed, Optimized And Commented By: NeuralNine (Florian Dedov)
 
 import math
+import multiprocessing
 import pickle
 import random
 import sys
 import os
 
 import neat
+import numpy as np
 import pygame
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Geometry import CORNERS, HEADINGS, RADARS, RADAR_DEGREES, angle_index
+from Radar import RADAR_ENGINES
+from Sprites import get_sprite_cache
+from FeedForwardBatch import FeedForwardBatch
+from MapCache import load_track
+from TrackMap import BORDER, OUT_OF_BOUNDS
+
 # Constants
 # WIDTH = 1600
 # HEIGHT = 880
@@ -22,6 +32,12 @@ CAR_SIZE_Y = 60
 
 BORDER_COLOR = (255, 255, 255, 255) # Color To Crash on Hit
 
+RADAR_ENGINE = "sphere"  # "march" Steps Pixel By Pixel, "sphere" Uses The Distance Field
+RADAR_STOPS = (BORDER, OUT_OF_BOUNDS)
+
+MAP_PATH = '../assets/map3.png'
+MAX_TICKS = 30 * 40  # Stop After About 20 Seconds
+
 current_generation = 0 # Generation counter
 
 time_training = 0
@@ -29,10 +45,8 @@ time_training = 0
 class Car:
 
     def __init__(self):
-        # Load Car Sprite and Rotate
-        self.sprite = pygame.image.load('../assets/car.png').convert() # Convert Speeds Up A Lot
-        self.sprite = pygame.transform.scale(self.sprite, (CAR_SIZE_X, CAR_SIZE_Y))
-        self.rotated_sprite = self.sprite 
+        # Car Sprite Loaded Once And Shared By Every Car, Rotated Only When Drawn
+        self.sprites = get_sprite_cache(size=(CAR_SIZE_X, CAR_SIZE_Y))
 
         # self.position = [690, 740] # Starting Position
         self.position = [830, 920] # Starting Position
@@ -52,7 +66,7 @@ class Car:
         self.time = 0 # Time Passed
 
     def draw(self, screen):
-        screen.blit(self.rotated_sprite, self.position) # Draw Sprite
+        screen.blit(self.sprites.rotated(self.angle), self.position) # Draw Sprite
         self.draw_radar(screen) #OPTIONAL FOR SENSORS
 
     def draw_radar(self, screen):
@@ -62,41 +76,38 @@ class Car:
             pygame.draw.line(screen, (0, 255, 0), self.center, position, 1)
             pygame.draw.circle(screen, (0, 255, 0), position, 5)
 
-    def check_collision(self, game_map):
+    def check_collision(self, game_track):
         self.alive = True
         for point in self.corners:
-            # If Any Corner Touches Border Color -> Crash
+            # If Any Corner Touches Border Color (Or Leaves The Map) -> Crash
             # Assumes Rectangle
-            if game_map.get_at((int(point[0]), int(point[1]))) == BORDER_COLOR:
+            if game_track.label_at(int(point[0]), int(point[1])) in RADAR_STOPS:
                 self.alive = False
                 break
 
-    def check_radar(self, degree, game_map):
-        length = 0
-        x = int(self.center[0] + math.cos(math.radians(360 - (self.angle + degree))) * length)
-        y = int(self.center[1] + math.sin(math.radians(360 - (self.angle + degree))) * length)
-
+    def check_radar(self, degree, game_track, direction=None):
         # While We Don't Hit BORDER_COLOR AND length < 300 (just a max) -> go further and further
-        while not game_map.get_at((x, y)) == BORDER_COLOR and length < 300:
-            length = length + 1
-            x = int(self.center[0] + math.cos(math.radians(360 - (self.angle + degree))) * length)
-            y = int(self.center[1] + math.sin(math.radians(360 - (self.angle + degree))) * length)
+        x, y, label, length = RADAR_ENGINES[RADAR_ENGINE](game_track, self.center[0], self.center[1],
+                                                          360 - (self.angle + degree), 300, RADAR_STOPS,
+                                                          direction=direction)
 
         # Calculate Distance To Border And Append To Radars List
         dist = int(math.sqrt(math.pow(x - self.center[0], 2) + math.pow(y - self.center[1], 2)))
         self.radars.append([(x, y), dist])
-    
-    def update(self, game_map):
+
+    def update(self, game_track):
         # Set The Speed To 20 For The First Time
         # Only When Having 4 Output Nodes With Speed Up and Down
         if not self.speed_set:
             self.speed = 20
             self.speed_set = True
 
-        # Get Rotated Sprite And Move Into The Right X-Direction
+        # Direction Tables Of The Current Angle (See Geometry)
+        angle = angle_index(self.angle)
+
+        # Move Into The Right X-Direction
         # Don't Let The Car Go Closer Than 20px To The Edge
-        self.rotated_sprite = self.rotate_center(self.sprite, self.angle)
-        self.position[0] += math.cos(math.radians(360 - self.angle)) * self.speed
+        self.position[0] += HEADINGS[angle][0] * self.speed
         self.position[0] = max(self.position[0], 20)
         self.position[0] = min(self.position[0], WIDTH - 120)
 
@@ -105,7 +116,7 @@ class Car:
         self.time += 1
         
         # Same For Y-Position
-        self.position[1] += math.sin(math.radians(360 - self.angle)) * self.speed
+        self.position[1] += HEADINGS[angle][1] * self.speed
         self.position[1] = max(self.position[1], 20)
         self.position[1] = min(self.position[1], WIDTH - 120)
 
@@ -115,19 +126,16 @@ class Car:
         # Calculate Four Corners
         # Length Is Half The Side
         length = 0.5 * CAR_SIZE_X
-        left_top = [self.center[0] + math.cos(math.radians(360 - (self.angle + 30))) * length, self.center[1] + math.sin(math.radians(360 - (self.angle + 30))) * length]
-        right_top = [self.center[0] + math.cos(math.radians(360 - (self.angle + 150))) * length, self.center[1] + math.sin(math.radians(360 - (self.angle + 150))) * length]
-        left_bottom = [self.center[0] + math.cos(math.radians(360 - (self.angle + 210))) * length, self.center[1] + math.sin(math.radians(360 - (self.angle + 210))) * length]
-        right_bottom = [self.center[0] + math.cos(math.radians(360 - (self.angle + 330))) * length, self.center[1] + math.sin(math.radians(360 - (self.angle + 330))) * length]
-        self.corners = [left_top, right_top, left_bottom, right_bottom]
+        cx, cy = self.center
+        self.corners = [[cx + dx * length, cy + dy * length] for dx, dy in CORNERS[angle]]
 
         # Check Collisions And Clear Radars
-        self.check_collision(game_map)
+        self.check_collision(game_track)
         self.radars.clear()
 
         # From -90 To 120 With Step-Size 45 Check Radar
-        for d in range(-90, 120, 45):
-            self.check_radar(d, game_map)
+        for r, d in enumerate(RADAR_DEGREES):
+            self.check_radar(d, game_track, RADARS[angle][r])
 
     def get_data(self):
         # Get Distances To Border
@@ -147,30 +155,37 @@ class Car:
         # return self.distance / 50.0
         return self.distance / (CAR_SIZE_X / 2)
 
-    def rotate_center(self, image, angle):
-        # Rotate The Rectangle
-        rectangle = image.get_rect()
-        rotated_image = pygame.transform.rotate(image, angle)
-        rotated_rectangle = rectangle.copy()
-        rotated_rectangle.center = rotated_image.get_rect().center
-        rotated_image = rotated_image.subsurface(rotated_rectangle).copy()
-        return rotated_image
+
+def drive(car, net):
+    # Apply The Action Chosen By The Network From The Car's Radars
+    output = net.activate(car.get_data())
+    steer(car, output.index(max(output)))
+
+
+def steer(car, choice):
+    if choice == 0:
+        car.angle += 10 # Left
+    elif choice == 1:
+        car.angle -= 10 # Right
+    elif choice == 2:
+        if(car.speed - 2 >= 12):
+            car.speed -= 2 # Slow Down
+    else:
+        car.speed += 2 # Speed Up
 
 
 def run_simulation(genomes, config):
     
-    # Empty Collections For Nets and Cars
-    nets = []
+    # Empty Collection For Cars
     cars = []
 
     # Initialize PyGame And The Display
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
 
-    # For All Genomes Passed Create A New Neural Network
+    # For All Genomes Passed Create A New Neural Network, All Evaluated Together
+    nets = FeedForwardBatch.create([g for i, g in genomes], config)
     for i, g in genomes:
-        net = neat.nn.FeedForwardNetwork.create(g, config)
-        nets.append(net)
         g.fitness = 0
 
         cars.append(Car())
@@ -180,7 +195,8 @@ def run_simulation(genomes, config):
     clock = pygame.time.Clock()
     generation_font = pygame.font.SysFont("Arial", 30)
     alive_font = pygame.font.SysFont("Arial", 20)
-    game_map = pygame.image.load('../assets/map3.png').convert() # Convert Speeds Up A Lot
+    game_map = pygame.image.load(MAP_PATH).convert() # Convert Speeds Up A Lot
+    game_track = load_track(MAP_PATH)  # Label Grid Used By Radars And Collisions, Shared (See MapCache)
 
     global current_generation
     current_generation += 1
@@ -199,18 +215,9 @@ def run_simulation(genomes, config):
                 sys.exit(0)
 
         # For Each Car Get The Acton It Takes
-        for i, car in enumerate(cars):
-            output = nets[i].activate(car.get_data())
-            choice = output.index(max(output))
-            if choice == 0:
-                car.angle += 10 # Left
-            elif choice == 1:
-                car.angle -= 10 # Right
-            elif choice == 2:
-                if(car.speed - 2 >= 12):
-                    car.speed -= 2 # Slow Down
-            else:
-                car.speed += 2 # Speed Up
+        choices = nets.choices(np.array([car.get_data() for car in cars], dtype=np.float64))
+        for car, choice in zip(cars, choices.tolist()):
+            steer(car, choice)
         
         # Check If Car Is Still Alive
         # Increase Fitness If Yes And Break Loop If Not
@@ -218,14 +225,14 @@ def run_simulation(genomes, config):
         for i, car in enumerate(cars):
             if car.is_alive():
                 still_alive += 1
-                car.update(game_map)
+                car.update(game_track)
                 genomes[i][1].fitness += car.get_reward()
 
         if still_alive == 0:
             break
 
         counter += 1
-        if counter == 30 * 40: # Stop After About 20 Seconds
+        if counter == MAX_TICKS:
             break
 
         # Draw Map And All Cars That Are Alive
@@ -253,6 +260,62 @@ def run_simulation(genomes, config):
         pygame.display.flip()
         clock.tick(100) # 60 FPS
 
+# Headless Evaluation In Worker Processes
+# Cars Never Interact, So A Genome's Fitness Only Depends On Its Own Car:
+# Each Worker Simulates Its Genomes One By One, Exactly Like run_simulation Does
+
+worker_track = None
+worker_config = None
+
+
+def init_worker(map_path, config):
+    # Map Memory-Mapped From The Cache, Shared By Every Worker Process
+    global worker_track, worker_config
+    worker_track = load_track(map_path)
+    if RADAR_ENGINE == "sphere":
+        worker_track.distance_field(RADAR_STOPS)
+    worker_config = config
+
+
+def eval_genome(genome):
+    net = neat.nn.FeedForwardNetwork.create(genome, worker_config)
+    car = Car()
+    fitness = 0
+    for _ in range(MAX_TICKS):
+        drive(car, net)
+        car.update(worker_track)
+        fitness += car.get_reward()
+        if not car.is_alive():
+            break
+    return fitness
+
+
+class ParallelSimulation:
+    """
+    Headless fitness function for population.run, like neat-python's
+    ParallelEvaluator: the genomes are split across a pool of processes
+    that each loaded the map once. Same fitness values as run_simulation.
+    """
+
+    def __init__(self, config, num_workers=None, map_path=MAP_PATH):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(self.num_workers, initializer=init_worker, initargs=(map_path, config))
+
+    def evaluate(self, genomes, config):
+        global current_generation
+        current_generation += 1
+
+        # A Few Chunks Per Worker, So Slow Genomes (Long Lived Cars) Are Spread Out
+        chunksize = max(1, len(genomes) // (4 * self.num_workers))
+        fitnesses = self.pool.map(eval_genome, [genome for _, genome in genomes], chunksize)
+        for (_, genome), fitness in zip(genomes, fitnesses):
+            genome.fitness = fitness
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
 if __name__ == "__main__":
     
     # Load Config
@@ -270,7 +333,14 @@ if __name__ == "__main__":
     population.add_reporter(stats)
 
     # Run Simulation For A Maximum of 1000 Generations
-    winner = population.run(run_simulation, 40)
+    # HEADLESS: Evaluate The Genomes In Parallel Without Display (All CPU Cores By Default)
+    HEADLESS = False
+    if HEADLESS:
+        simulation = ParallelSimulation(config)
+        winner = population.run(simulation.evaluate, 40)
+        simulation.close()
+    else:
+        winner = population.run(run_simulation, 40)
 
     # Save the winner (best genome) to a file
     with open('winner_map5.pkl', 'wb') as f:
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+
+# Phases Of A RaceServer Tick, In Report Order
+# "radar" Is Part Of "physics", "reward" Part Of "physics" (RaceWorld) Or "send" (CarServer)
+PHASES = ("wait", "receive", "physics", "radar", "reward", "send", "record", "draw", "tick")
+PERCENTILES = (50, 95, 99)
+
+
+class RingBuffer:
+    # The Last `capacity` Durations Of A Phase, Overwriting The Oldest Ones
+
+    def __init__(self, capacity):
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def recent(self):
+        return self.values[:min(self.count, len(self.values))]
+
+
+class PhaseProfiler:
+    """
+    Durations of the phases of RaceServer ticks (see PHASES), per tick or
+    per car, kept in fixed-size ring buffers.
+
+    Every `report_every` seconds, the p50 / p95 / p99 of every buffer are
+    appended to `path`, or printed when no path is given. RaceServer only
+    times anything when it is given a profiler: without one, each phase
+    costs a single `is not None` test.
+    """
+
+    def __init__(self, capacity=4096, report_every=10, path=None):
+        self.capacity = capacity
+        self.report_every = report_every
+        self.path = path
+        self.buffers = {}  # (phase, car_id Or None) -> RingBuffer
+        self.lastReportTime = time.perf_counter()
+
+    def record(self, phase, start, car=None):
+        # Store The Time Elapsed Since `start` (A perf_counter Value), Returns The Current Time
+        now = time.perf_counter()
+        buffer = self.buffers.get((phase, car))
+        if buffer is None:
+            buffer = self.buffers[(phase, car)] = RingBuffer(self.capacity)
+        buffer.append(now - start)
+        return now
+
+    def summary(self):
+        lines = ["{:8s} {:>6s} {:>9s} {:>9s}".format("phase", "car", "samples", "mean us")
+                 + "".join(" {:>8s}".format("p{} us".format(p)) for p in PERCENTILES)]
+        order = {phase: i for i, phase in enumerate(PHASES)}
+        for phase, car in sorted(self.buffers, key=lambda key: (order.get(key[0], len(order)), str(key[1]))):
+            buffer = self.buffers[(phase, car)]
+            values = buffer.recent() * 1e6
+            lines.append("{:8s} {:>6s} {:9d} {:9.1f}".format(phase, "-" if car is None else str(car),
+                                                               buffer.count, values.mean())
+                         + "".join(" {:8.1f}".format(p) for p in np.percentile(values, PERCENTILES)))
+        return "\n".join(lines)
+
+    def report(self):
+        # Dump The Summary If `report_every` Seconds Passed Since The Last One
+        if time.perf_counter() - self.lastReportTime >= self.report_every:
+            self.dump()
+
+    def dump(self):
+        self.lastReportTime = time.perf_counter()
+        if not self.buffers:
+            return
+        text = "Profile : {} (last {} samples per phase)\n{}\n".format(time.strftime("%Y-%m-%d %H:%M:%S"),
+                                                                      self.capacity, self.summary())
+        if self.path is None:
+            print(text)
+        else:
+            with open(self.path, "a") as f:
+                f.write(text + "\n")
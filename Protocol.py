@@ -0,0 +1,157 @@
+import socket
+import struct
+import time
+
+import numpy as np
+
+from Constants import CONNECT_TIMEOUT, HOST, NB_RADARS, PORT
+
+# Binary Wire Protocol Between CarClient And CarServer
+#
+# Handshake (text, both protocols): the client sends its id, optionally followed by
+# ";key=value" options (see encode_hello), and the server answers "go".
+# With the option proto=binary, every following message is a frame:
+#   header  = version (uint8), type (uint8), payload length (uint32), little endian
+#   payload = fixed-size little endian records, decoded with np.frombuffer
+# Without it, the text packets of CarServer / CarClient are used as before.
+# With the option cars=K (binary only), one connection drives K cars (see CarBatchClient):
+# every message then holds one record per car, in the order of the cars.
+# With the option map=N (any protocol), the cars drive on assets/mapN.png when the
+# server hosts several maps (see RaceServer), else on the least busy map.
+
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct("<BBI")
+
+# Message Types
+MSG_ACTION = 1  # Client -> Server: ACTION_DTYPE
+MSG_RESET = 2  # Client -> Server: Empty Payload (Every Car) Or RESET_DTYPE (Those Cars Only)
+MSG_STEP = 3  # Server -> Client: STEP_DTYPE
+MSG_OBSERVATION = 4  # Server -> Client: OBSERVATION_DTYPE (Answer To MSG_RESET)
+
+ACTION_DTYPE = np.dtype([("steering", "<f4"), ("throttle", "<f4")])
+OBSERVATION_DTYPE = np.dtype([("obs", "<f4", (NB_RADARS,))])
+STEP_DTYPE = np.dtype([("obs", "<f4", (NB_RADARS,)), ("reward", "<f4"), ("terminated", "u1")])
+RESET_DTYPE = np.dtype([("car", "<u4")])  # Index Of The Car In Its Connection
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_hello(car_id, **options):
+    return ";".join([str(car_id)] + ["{}={}".format(key, value) for key, value in options.items()]).encode('utf-8')
+
+
+def parse_hello(packet):
+    # Returns (car_id, {option: value}), The Legacy Handshake Being Just The Id
+    fields = packet.decode('utf-8').split(";")
+    options = dict(field.split("=", 1) for field in fields[1:] if "=" in field)
+    return fields[0], options
+
+
+def encode_message(message_type, payload=b""):
+    return HEADER.pack(PROTOCOL_VERSION, message_type, len(payload)) + payload
+
+
+def encode_records(message_type, dtype, **fields):
+    # One Record Per Car, Every Field Given As A Sequence Of The Same Length
+    nb_records = len(next(iter(fields.values())))
+    records = np.zeros(nb_records, dtype=dtype)
+    for name, values in fields.items():
+        records[name] = values
+    return encode_message(message_type, records.tobytes())
+
+
+def encode_action(actions):
+    actions = np.asarray(actions, dtype=np.float32).reshape(-1, 2)
+    return encode_records(MSG_ACTION, ACTION_DTYPE, steering=actions[:, 0], throttle=actions[:, 1])
+
+
+def encode_reset(cars=None):
+    if cars is None:
+        return encode_message(MSG_RESET)
+    return encode_records(MSG_RESET, RESET_DTYPE, car=np.atleast_1d(cars))
+
+
+def encode_observation(obs):
+    return encode_records(MSG_OBSERVATION, OBSERVATION_DTYPE, obs=np.asarray(obs).reshape(-1, NB_RADARS))
+
+
+def encode_step(obs, reward, terminated):
+    return encode_records(MSG_STEP, STEP_DTYPE,
+                          obs=np.asarray(obs).reshape(-1, NB_RADARS),
+                          reward=np.atleast_1d(reward),
+                          terminated=np.atleast_1d(terminated))
+
+
+MESSAGE_DTYPES = {
+    MSG_ACTION: ACTION_DTYPE,
+    MSG_RESET: RESET_DTYPE,
+    MSG_OBSERVATION: OBSERVATION_DTYPE,
+    MSG_STEP: STEP_DTYPE,
+}
+
+
+def decode_records(message_type, payload):
+    dtype = MESSAGE_DTYPES.get(message_type)
+    if dtype is None or len(payload) % dtype.itemsize:
+        raise ProtocolError("Malformed message of type {} ({} bytes)".format(message_type, len(payload)))
+    return np.frombuffer(payload, dtype=dtype)
+
+
+class MessageReader:
+    """
+    Incremental frame decoder: feed() it whatever recv() returned, then pop
+    complete (type, payload) messages with next_message(). Frames split or
+    merged by TCP are handled transparently.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+
+    def has_message(self):
+        # Whether A Complete Frame Is Buffered, Returned By next_message() Without Reading More
+        if len(self.buffer) < HEADER.size:
+            return False
+        return len(self.buffer) >= HEADER.size + HEADER.unpack_from(self.buffer)[2]
+
+    def next_message(self):
+        if len(self.buffer) < HEADER.size:
+            return None
+        version, message_type, length = HEADER.unpack_from(self.buffer)
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError("Unsupported protocol version {} (expected {})".format(version, PROTOCOL_VERSION))
+        end = HEADER.size + length
+        if len(self.buffer) < end:
+            return None
+        payload = bytes(self.buffer[HEADER.size:end])
+        del self.buffer[:end]
+        return message_type, payload
+
+
+def connect(host=HOST, port=PORT, timeout=CONNECT_TIMEOUT):
+    # Socket Connected To The Race Server, Retried While It Is Still Starting (Not Listening Yet)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except ConnectionRefusedError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+def recv_message(conn, reader):
+    # Block Until A Complete Message Is Available, None If The Connection Closed
+    message = reader.next_message()
+    while message is None:
+        data = conn.recv(65536)
+        if not data:
+            return None
+        reader.feed(data)
+        message = reader.next_message()
+    return message
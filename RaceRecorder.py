@@ -0,0 +1,165 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from Geometry import RADAR_DEGREES
+
+# One Record Per Car And Per Step, Little Endian
+RECORD_DTYPE = np.dtype([
+    ("tick", "<u4"),  # Server Tick
+    ("car", "<u2"),  # Slot Of The Car
+    ("time", "<u4"),  # Steps Since The Car's Last Reset: A New Episode Starts When It Does Not Increase
+    ("x", "<f4"), ("y", "<f4"), ("angle", "<f4"), ("speed", "<f4"),
+    ("steering", "<f4"), ("throttle", "<f4"),
+    ("observation", "<u2", (len(RADAR_DEGREES),)),  # Radar Distances In Pixels The Action Was Chosen On
+    ("radars", "<u2", (len(RADAR_DEGREES),)),  # Radar Distances In Pixels After The Step (Next Observation)
+    ("reward", "<f4"),
+    ("terminated", "u1"),
+    ("sector", "u1"),
+])
+
+CHUNK_RECORDS = 1 << 18  # Records Per Chunk File (15 MB)
+BLOCK_RECORDS = 4096  # Records Handed To The Writer At Once
+INDEX_FILE = "recording.json"
+INDEX_EVERY = 1.0  # Seconds Between Index Updates While Recording
+
+
+class RaceRecorder:
+    """
+    Records every step of every car of a RaceServer (see RECORD_DTYPE)
+    into a directory of preallocated .npy chunks, read back lazily by
+    Replay.Recording.
+
+    The simulation only copies the records of a tick into a staging
+    block. Full blocks are copied into the memory-mapped chunks by a
+    background writer thread, which also keeps INDEX_FILE up to date with
+    the number of records of every chunk (at most INDEX_EVERY seconds
+    behind, should the server die).
+    """
+
+    def __init__(self, directory, chunk_records=CHUNK_RECORDS, block_records=BLOCK_RECORDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_records = chunk_records
+        self.block_records = block_records
+        self.meta = {"chunks": []}
+
+        # Staging Block Of The Simulation, Full Blocks For The Writer And Written Blocks To Reuse
+        self.block = np.zeros(block_records, dtype=RECORD_DTYPE)
+        self.count = 0
+        self.full_blocks = queue.Queue()
+        self.free_blocks = queue.Queue()
+
+        self.writer = threading.Thread(target=self.write, daemon=True)
+        self.writer.start()
+
+    def set_race(self, **race):
+        # Stored In The Index (Map, Number Of Cars, ...), Before The First Record
+        self.meta.update(race)
+        self.save_index()
+
+    def take(self, nb_records):
+        # The Next `nb_records` (At Most block_records) Records Of The Staging Block, Filled By The Caller
+        if self.count + nb_records > len(self.block):
+            self.flush()
+        records = self.block[self.count:self.count + nb_records]
+        self.count += nb_records
+        return records
+
+    def record_world(self, tick, world, slots, observations):
+        # The Cars Of A RaceWorld Just Stepped, `observations` Being Their Radar Distances Before The Step
+        for start in range(0, len(slots), self.block_records):
+            cars = slots[start:start + self.block_records]
+            records = self.take(len(cars))
+            records["tick"] = tick
+            records["car"] = cars
+
+            # Consecutive Slots (A Whole CarBatchServer For Example) Are Read Through Views, Not Gathered
+            part = cars
+            if cars[-1] - cars[0] == len(cars) - 1 and np.all(np.diff(cars) == 1):
+                part = slice(cars[0], cars[-1] + 1)
+            records["time"] = world.time[part]
+            records["x"] = world.position[part, 0]
+            records["y"] = world.position[part, 1]
+            records["angle"] = world.angle[part]
+            records["speed"] = world.speed[part]
+            records["steering"] = world.actions[part, 0]
+            records["throttle"] = world.actions[part, 1]
+            records["observation"] = observations[start:start + self.block_records]
+            records["radars"] = world.radar_dist[part]
+            records["reward"] = world.reward[part]
+            records["terminated"] = ~world.alive[part]
+            records["sector"] = world.current_sector[part]
+
+    def record_car(self, tick, car, action, observation):
+        # A CarServer Just Stepped With `action`, Chosen On The Radar Distances `observation`
+        records = self.take(1)
+        records[0] = (tick, car.slot, car.time, car.position[0], car.position[1], car.angle, car.speed,
+                      action[0], action[1], observation, [radar[1] for radar in car.radars], car.reward,
+                      not car.alive, car.current_sector)
+
+    def flush(self):
+        # Hand The Staging Block To The Writer
+        if self.count == 0:
+            return
+        self.full_blocks.put((self.block, self.count))
+        try:
+            self.block = self.free_blocks.get_nowait()
+        except queue.Empty:
+            self.block = np.zeros(self.block_records, dtype=RECORD_DTYPE)
+        self.count = 0
+
+    def write(self):
+        # Writer Thread: Copy The Full Blocks Into The Chunks, Until A None Block
+        chunk = None
+        index_time = time.perf_counter()
+        while True:
+            item = self.full_blocks.get()
+            if item is None:
+                break
+            block, count = item
+
+            written = 0
+            while written < count:
+                if chunk is None or self.meta["chunks"][-1]["records"] == len(chunk):
+                    if chunk is not None:
+                        chunk.flush()
+                    chunk = self.open_chunk()
+                offset = self.meta["chunks"][-1]["records"]
+                nb_records = min(count - written, len(chunk) - offset)
+                chunk[offset:offset + nb_records] = block[written:written + nb_records]
+                self.meta["chunks"][-1]["records"] = offset + nb_records
+                written += nb_records
+
+            self.free_blocks.put(block)
+            if time.perf_counter() - index_time >= INDEX_EVERY:
+                self.save_index()
+                index_time = time.perf_counter()
+
+        if chunk is not None:
+            chunk.flush()
+        self.save_index()
+
+    def open_chunk(self):
+        name = "chunk_{:05d}.npy".format(len(self.meta["chunks"]))
+        chunk = np.lib.format.open_memmap(os.path.join(self.directory, name), mode="w+", dtype=RECORD_DTYPE,
+                                          shape=(self.chunk_records,))
+        self.meta["chunks"].append({"file": name, "records": 0})
+        return chunk
+
+    def save_index(self):
+        # Written Aside Then Renamed, So A Reader Never Sees Half An Index
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        # Write The Remaining Records And Stop The Writer
+        self.flush()
+        self.full_blocks.put(None)
+        self.writer.join()
@@ -0,0 +1,234 @@
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+
+from Constants import HEIGHT, WIDTH
+from Geometry import RADAR_DEGREES
+from Sprites import draw_radar
+
+FULL_REDRAW_AREA = 0.5  # Redraw The Whole Frame When The Last One Drew Over More Than This Part Of It
+TEXT_COLOR = (0, 0, 0)
+IDLE_SLEEP = 0.002  # Seconds An Uncapped Render Thread Waits When No New Snapshot Is Ready, Leaving The GIL
+
+# SDL Only Lets The Main Thread Create And Poll A Window On macOS, And Some Windows Drivers Stop Delivering
+# Its Events Elsewhere: There, The Window Stays With The Simulation Instead Of Moving To A Render Thread
+RENDER_THREAD_UNSUPPORTED = ("darwin", "win32")
+
+
+def render_thread_supported():
+    return sys.platform not in RENDER_THREAD_UNSUPPORTED
+
+
+class RaceSnapshot:
+    """
+    What a frame shows of a race, copied out of the simulation: every car
+    (by slot) with its radars, and the info texts.
+    """
+
+    def __init__(self, nb_cars):
+        self.active = np.zeros(nb_cars, dtype=bool)
+        self.position = np.zeros((nb_cars, 2), dtype=np.float64)
+        self.angle = np.zeros(nb_cars, dtype=np.float64)
+        self.center = np.zeros((nb_cars, 2), dtype=np.float64)
+        self.radar_end = np.zeros((nb_cars, len(RADAR_DEGREES), 2), dtype=np.int64)
+        self.nb_radars = np.zeros(nb_cars, dtype=np.int64)  # A CarServer Has None Before Its First Update
+
+        self.seconds = 0  # Since The Server Started
+        self.best_reward = 0
+        self.ticks_per_second = 0
+        self.path = None  # Where To Save The Frame (See RaceServer.request_render)
+
+    def copy_world(self, world):
+        np.copyto(self.active, world.active)
+        np.copyto(self.position, world.position)
+        np.copyto(self.angle, world.angle)
+        np.copyto(self.center, world.center)
+        np.copyto(self.radar_end, world.radar_end)
+        self.nb_radars[:] = len(RADAR_DEGREES)
+
+    def copy_cars(self, cars):
+        # CarServers Simulating Their Own Car, Each In Its Slot
+        self.active[:] = False
+        for car in cars:
+            self.active[car.slot] = True
+            self.position[car.slot] = car.position
+            self.angle[car.slot] = car.angle
+            self.center[car.slot] = car.center
+            self.nb_radars[car.slot] = len(car.radars)
+            for r, radar in enumerate(car.radars):
+                self.radar_end[car.slot, r] = radar[0]
+
+
+class SnapshotBuffer:
+    """
+    Two RaceSnapshots passed from the simulation (the only writer) to a
+    render thread (the only reader) without locks.
+
+    The simulation fills a snapshot only once the renderer took the last
+    published one, and always the other one: the renderer never reads a
+    snapshot being written. States published meanwhile are never copied.
+    """
+
+    def __init__(self, nb_cars):
+        self.snapshots = (RaceSnapshot(nb_cars), RaceSnapshot(nb_cars))
+        self.next = 0  # The Snapshot The Simulation Fills Next
+        self.ready = None  # Published, Not Taken Yet By The Renderer
+
+    def writable(self):
+        # The Snapshot To Fill, None While The Renderer Did Not Take The Last One
+        return self.snapshots[self.next] if self.ready is None else None
+
+    def publish(self):
+        self.ready = self.snapshots[self.next]
+        self.next = 1 - self.next
+
+    def take(self):
+        # The Last Published Snapshot, None If There Is No New One
+        snapshot = self.ready
+        if snapshot is not None:
+            self.ready = None
+        return snapshot
+
+
+class RaceRenderer:
+    """
+    Draws the frames of a race from RaceSnapshots: the map, every car with
+    its radars, and the info texts when drawn into a window. The window,
+    its font and the map image are only created for the first frame:
+    servers start without them, and headless races never drawn skip them.
+
+    Frames are drawn incrementally: only the map under what the last frame
+    drew is restored, and only those rectangles are sent to the display.
+    start() runs the renderer in its own thread, owning the window, so
+    the simulation never waits for a frame nor for the frame rate cap
+    (not on the RENDER_THREAD_UNSUPPORTED platforms).
+    """
+
+    def __init__(self, map_path, sprites, window=True, draw_radars=True, max_fps=60):
+        self.map_path = map_path
+        self.MAP = None  # Loaded On First Frame
+        self.SPRITES = sprites
+        self.window = window  # False: Frames Are Drawn Off-Screen (Headless)
+        self.screen = None  # The Window Or The Off-Screen Frame, Created On First Frame
+        self.font = None  # Only With A Window
+        self.draw_radars = draw_radars
+        self.max_fps = max_fps  # Of The Render Thread, None = Uncapped
+
+        self.full_frame = True
+        self.restored = []  # Rectangles Of The Last Frame Restored By This One
+        self.dirty_rects = None  # Rectangles Drawn Over By The Last Frame (None = Whole Frame)
+        self.texts = {}  # Text Center -> (Text, Surface), Rendered Again When The Text Changes
+
+        self.thread = None
+        self.running = False
+
+    def draw(self, snapshot):
+        if self.screen is None:
+            self.open()
+        if self.MAP is None:
+            self.MAP = pygame.image.load(self.map_path)
+            if pygame.display.get_surface() is not None:
+                self.MAP = self.MAP.convert()  # Convert Speeds Up A Lot
+
+        # Draw Map, Or Only Restore It Where The Last Frame Drew
+        self.full_frame = self.dirty_rects is None or (
+                sum(rect.w * rect.h for rect in self.dirty_rects) > FULL_REDRAW_AREA * WIDTH * HEIGHT)
+        if self.full_frame:
+            self.screen.blit(self.MAP, (0, 0))
+            self.restored = []
+        else:
+            for rect in self.dirty_rects:
+                self.screen.blit(self.MAP, rect, rect)
+            self.restored = self.dirty_rects
+
+        # Draw Cars
+        drawn = []
+        for slot in np.flatnonzero(snapshot.active):
+            # Draw Sprite (Pre-Rotated, From The Shared SpriteCache)
+            drawn.append(self.screen.blit(self.SPRITES.rotated(snapshot.angle[slot]), snapshot.position[slot]))
+
+            # Draw Radars
+            if self.draw_radars:
+                center = snapshot.center[slot]
+                drawn.extend(draw_radar(self.screen, center, position)
+                             for position in snapshot.radar_end[slot, :snapshot.nb_radars[slot]])
+
+        # Display Info
+        if self.font is not None:
+            drawn.append(self.display_text("Time: " + str(snapshot.seconds) + "s", (900, 460)))
+            drawn.append(self.display_text("Best Reward: " + str(snapshot.best_reward), (900, 500)))
+            drawn.append(self.display_text("Ticks/s: " + str(snapshot.ticks_per_second), (900, 540)))
+        self.dirty_rects = drawn
+
+        if snapshot.path is not None:
+            pygame.image.save(self.screen, snapshot.path)
+
+    def open(self):
+        if not self.window:
+            self.screen = pygame.Surface((WIDTH, HEIGHT))  # Headless: Off-Screen Frame
+            return
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+        self.font = pygame.font.SysFont("Arial", 30)  # Scans The System Fonts
+
+    def display_text(self, text, center):
+        cached = self.texts.get(center)
+        if cached is None or cached[0] != text:
+            cached = self.texts[center] = (text, self.font.render(text, True, TEXT_COLOR))
+        text_rect = cached[1].get_rect()
+        text_rect.center = center
+        return self.screen.blit(cached[1], text_rect)
+
+    def present(self):
+        # Send The Last Drawn Frame To The Display
+        if self.full_frame:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.restored + self.dirty_rects)
+
+    def quit_requested(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return True
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_ESCAPE:
+                    return True
+        return False
+
+    def start(self, snapshots):
+        # Render The Snapshots Published Into A SnapshotBuffer From A New Thread
+        self.running = True
+        self.thread = threading.Thread(target=self.run, args=(snapshots,), daemon=True)
+        self.thread.start()
+
+    def run(self, snapshots):
+        # The Window Belongs To This Thread: Created, Drawn And Polled Here
+        self.open()
+        clock = pygame.time.Clock()
+
+        while self.running:
+            snapshot = snapshots.take()
+            if snapshot is not None:
+                self.draw(snapshot)
+                self.present()
+
+            # Closing The Window Stops Watching, Not The Race
+            if self.quit_requested():
+                break
+            if self.max_fps:
+                clock.tick(self.max_fps)
+            elif snapshot is None:
+                time.sleep(IDLE_SLEEP)
+
+        self.running = False
+        pygame.display.quit()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
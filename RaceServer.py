@@ -1,107 +1,482 @@
+import os
+import selectors
 import socket
 import sys
-import threading
 import time
 
+import numpy as np
 import pygame
 
+from CarBatchServer import CarBatchServer
 from CarServer import CarServer
-
-HOST = "0.0.0.0"
-PORT = 1236
-
-WIDTH = 1920
-HEIGHT = 1080
-
-CAR_SIZE_X = 60
-CAR_SIZE_Y = 60
+from Collision import CRASH_STOPS
+from Constants import CAR_SIZE_X, CAR_SIZE_Y, PORT, SERVER_HOST
+from MapCache import load_track
+from Protocol import parse_hello
+from RaceRenderer import RaceRenderer, RaceSnapshot, SnapshotBuffer, render_thread_supported
+from RaceWorld import RaceWorld
+from Sprites import get_sprite_cache
 
 
 class RaceServer:
 
-    def __init__(self, NB_CARS=1, NB_MAPS=1):
+    def __init__(self, NB_CARS=1, NB_MAPS=1, radar_engine="sphere", physics="batched",
+                 headless=False, render_every=None, max_fps=60, draw_radars=True, render_thread=False,
+                 tick_mode="lockstep", max_staleness=None, report_every=None, transport=None, profiler=None,
+                 recorder=None, maps=None, port=PORT, reporter=None, car_collisions=False, car_radars=False,
+                 collision="corners"):
         self.NB_CARS = NB_CARS
-        # Initialize a socket server
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server.bind((HOST, PORT))
-
-        # Initialize PyGame And The Display
-        pygame.init()
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+        self.radar_engine = radar_engine
+        self.physics = physics  # "batched": One RaceWorld Per Map, "car": One CarServer Each
+        self.collision = collision  # "corners" Or "swept" (See Collision)
+
+        # Ids Of The Maps Hosted By This Server, Each Car Drives On The One Chosen In Its Handshake
+        # Or On The Least Busy One. The Window Shows The First Map And Its Cars
+        self.MAPS = [NB_MAPS] if maps is None else list(maps)
+        if not self.MAPS or len(set(self.MAPS)) != len(self.MAPS):
+            raise ValueError("The maps hosted must be distinct, got {}".format(self.MAPS))
+        self.map_paths = {map_id: 'assets/map{}.png'.format(map_id) for map_id in self.MAPS}
+        self.map_cars = {map_id: 0 for map_id in self.MAPS}  # Cars Connected Per Map
+        self.car_maps = [None] * NB_CARS  # Map Id Of Every Slot
+
+        # "lockstep": Every Tick Waits For Every Car, "async": Each Car Advances As Soon As Its Action Arrives
+        # In Async Mode, A Car At Least `max_staleness` Steps Ahead Of The Slowest One Waits For It (None = Never)
+        if tick_mode not in ("lockstep", "async"):
+            raise ValueError("Unknown tick mode: '{}'".format(tick_mode))
+        if max_staleness is not None and max_staleness < 1:
+            raise ValueError("max_staleness must be at least 1")
+        self.tick_mode = tick_mode
+        self.max_staleness = max_staleness
+        self.held = set()  # Cars Waiting For The Slowest One
+
+        # Print Per Car Steps Per Second Every `report_every` Seconds (None = Never)
+        # Or Hand Them To `reporter` ({car_id: steps/s}), See RaceShards
+        self.report_every = report_every
+        self.reporter = reporter
+        self.lastReportTime = time.perf_counter()
+        self.lastReportSteps = {}
+
+        # Phase Durations Of Every Tick (See PhaseProfiler), None = Not Timed At All
+        self.profiler = profiler
+
+        # Every Step Of Every Car Recorded (See RaceRecorder), None = Not Recorded
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.set_race(map=self.map_paths[self.MAPS[0]], maps=list(self.map_paths.values()),
+                              nb_cars=NB_CARS, physics=physics)
+
+        # Headless: No Display, No Fonts, No Frame Cap
+        # Frames Are Drawn Every `render_every` Ticks (0 = Only On request_render)
+        # Into The Window, Or Into An Off-Screen Surface When Headless
+        # With A Render Thread, The Window Shows The Latest Tick At `max_fps` And Ticks Are Never Capped
+        self.headless = headless
+        self.render_thread = render_thread and not headless
+        if self.render_thread and not render_thread_supported():
+            print("Server : no render thread on {}, frames are drawn between ticks".format(sys.platform))
+            self.render_thread = False
+        self.render_every = (0 if headless else 1) if render_every is None else render_every
+        self.max_fps = None if headless or self.render_thread else max_fps  # None = Uncapped
+        self.render_requested = False
+        self.render_path = None
+
+        # Initialize a socket server, Unless Clients Talk Through A SharedTransport (Same Host Only)
+        # Port 0 Lets The System Pick A Free Port, Read Back From self.port
+        self.transport = transport
+        self.selector = None
+        self.buffered = set()  # Cars With A Complete Frame Already Read: Their Socket Won't Be Readable For It
+        self.port = None
+        if transport is None:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.bind((SERVER_HOST, port))
+            self.server.listen(NB_CARS)  # Clients Starting Before The Race Wait In The Backlog
+            self.port = self.server.getsockname()[1]
+        elif transport.nb_cars < NB_CARS:
+            raise ValueError("The shared transport has {} slots for {} cars".format(transport.nb_cars, NB_CARS))
+
+        # The Window And Its Font Are Only Created With The First Frame (See RaceRenderer)
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
 
         # Init pygame assets
         self.clock = pygame.time.Clock()
-        self.SPRITE = pygame.image.load('assets/car.png').convert()  # Convert Speeds Up A Lot
-        self.SPRITE = pygame.transform.scale(self.SPRITE, (CAR_SIZE_X, CAR_SIZE_Y))
-        self.MAP = pygame.image.load('assets/map{}.png'.format(NB_MAPS)).convert()  # Convert Speeds Up A Lot
-        self.font = pygame.font.SysFont("Arial", 30)
+        self.SPRITES = get_sprite_cache('assets/car.png', (CAR_SIZE_X, CAR_SIZE_Y))  # Loaded On First Frame
+        # Label Grids Used By Radars And Collisions, Shared (See MapCache)
+        self.TRACKS = {map_id: load_track(path) for map_id, path in self.map_paths.items()}
+        if radar_engine == "sphere":
+            for track in self.TRACKS.values():
+                track.distance_field()  # Precompute Before The Race Starts
+                if collision == "swept":
+                    track.distance_field(CRASH_STOPS)
+        # Cars Keep Their Slot In The RaceWorld Of Their Map, Each World Has A Slot For Every Car
+        # Cars Of A Map Only Crash Into / See Each Other With car_collisions / car_radars (See RaceWorld)
+        if (car_collisions or car_radars) and physics != "batched":
+            raise ValueError("Car-to-car contacts need the batched physics")
+        self.worlds = {}
+        if physics == "batched":
+            for map_id, track in self.TRACKS.items():
+                self.worlds[map_id] = RaceWorld(track, NB_CARS, radar_engine, car_collisions, car_radars,
+                                                collision)
+                self.worlds[map_id].profiler = profiler
+
+        # Frames Are Drawn From Snapshots Of The Race (See RaceRenderer)
+        self.renderer = RaceRenderer(self.map_paths[self.MAPS[0]], self.SPRITES, not headless, draw_radars, max_fps)
+        self.snapshot = RaceSnapshot(NB_CARS)
+        self.snapshots = SnapshotBuffer(NB_CARS) if self.render_thread else None
 
         # Create an empty list of cars
         self.cars = []
+        self.tick = 0
         self.time = time.time()
-        self.lastFrameTime = round(time.time() * 1000)
+        self.lastFrameTime = time.perf_counter()
+        self.lastFrameTick = 0
         self.fpsBuffer = []
         self.best_reward = 0
 
-        # Draw Map
-        self.draw()
         print("Server ready for running !")
 
-    def call_car_step(self, car):
-        car.step()
-
     def run(self):
+        # Draw Map, The Window Opens While Clients Are Already Connecting
+        if self.render_thread:
+            self.renderer.start(self.snapshots)
+        if not self.headless:
+            self.draw()
+
         print("Server : Server running !")
         print("Server : waiting for {} clients!".format(self.NB_CARS))
-        self.server.listen(self.NB_CARS)
-        # Wait for clients
-        for i in range(self.NB_CARS):
-            conn, addr = self.server.accept()
-            car_id = conn.recv(1024).decode('utf-8')
-            car = CarServer(car_id, conn, addr, self.screen, self.SPRITE, self.MAP)
-            self.cars.append(car)
-            print("Server : New Car connected id:", car_id)
+        if self.transport is None:
+            self.accept_clients()
+        else:
+            self.attach_clients()
 
         print("Server : All clients connected !")
-        print("Server : Start in 3 seconds !")
-        for i in range(3):
-            print("Server : {}".format(3 - i))
-            pygame.time.wait(1000)
+        if len(self.MAPS) > 1:
+            print("Server : Cars per map: " + ", ".join("map {}: {}".format(map_id, nb_cars)
+                                                      for map_id, nb_cars in self.map_cars.items()))
+        if self.recorder is not None:
+            self.recorder.set_race(car_maps=[self.map_paths.get(map_id) for map_id in self.car_maps])
+        if not self.headless:
+            # Countdown For Whoever Watches The Window
+            print("Server : Start in 3 seconds !")
+            for i in range(3):
+                print("Server : {}".format(3 - i))
+                pygame.time.wait(1000)
 
         print("Server : GO !")
         for car in self.cars:
-            car.conn.send("go".encode('utf-8'))
+            car.send_go()
+
+        # One Long Lived Selector Over Every Client Socket
+        if self.transport is None:
+            self.selector = selectors.DefaultSelector()
+            for car in self.cars:
+                self.selector.register(car.conn, selectors.EVENT_READ, car)
 
-        tick = 0
+        self.tick = 0
+        self.lastReportTime = time.perf_counter()
         # Main Loop
         while len(self.cars) > 0:
-            # print("\n\nServer : tick {}".format(tick))
-            car_thread = []
-            for index, car in enumerate(self.cars):
-                car_thread.append(threading.Thread(target=self.call_car_step, args=(car,)))
-                car_thread[index].start()
-
-            for index, car in enumerate(self.cars):
-                car_thread[index].join()
-                if not self.cars[index].isConnected:
-                    self.cars.pop(index)
-                    del car
-
-            self.draw()
-            tick += 1
+            # print("\n\nServer : tick {}".format(self.tick))
+            if self.profiler is not None:
+                start = time.perf_counter()
+            if self.tick_mode == "async":
+                self.step_cars_async()
+            else:
+                self.step_cars()
+            self.end_tick()
+            self.report_step_rates()
+            if self.profiler is not None:
+                self.profiler.record("tick", start)
+                self.profiler.report()
 
         # Close connections
         print('terminado')
+        self.renderer.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.profiler is not None:
+            self.profiler.dump()
         for car in self.cars:
             car.conn.close()
 
+    def accept_clients(self):
+        # Wait for clients, Until Every Car Has Its Slot (A Client Can Drive Several Cars)
+        nb_slots = 0
+        while nb_slots < self.NB_CARS:
+            conn, addr = self.server.accept()
+            car_id, options = parse_hello(conn.recv(1024))
+            protocol = options.get("proto", "text")
+            try:
+                nb_cars = int(options.get("cars", 1))
+                map_id = int(options["map"]) if "map" in options else self.least_busy_map()
+            except ValueError:
+                print("Server : Refused client id: {} (invalid options {})".format(car_id, options))
+                conn.close()
+                continue
+
+            # Several Cars Per Connection Need Binary Messages And The Batched Physics
+            if nb_cars < 1 or nb_slots + nb_cars > self.NB_CARS or map_id not in self.TRACKS or (
+                    nb_cars > 1 and (protocol != "binary" or not self.worlds)):
+                print("Server : Refused client id: {} ({} cars, {}, map {})".format(car_id, nb_cars, protocol,
+                                                                                   map_id))
+                conn.close()
+                continue
+
+            world = self.worlds.get(map_id)
+            if nb_cars > 1:
+                car = CarBatchServer(car_id, conn, addr, world, range(nb_slots, nb_slots + nb_cars))
+            else:
+                car = CarServer(car_id, conn, addr, None, self.SPRITES, self.TRACKS[map_id],
+                                radar_engine=self.radar_engine, world=world, slot=nb_slots,
+                                protocol=protocol, profiler=self.profiler, collision=self.collision)
+            self.assign_map(range(nb_slots, nb_slots + nb_cars), map_id)
+            nb_slots += nb_cars
+            self.cars.append(car)
+            print("Server : New Car connected id: {} ({} cars, map {})".format(car_id, nb_cars, map_id))
+
+    def attach_clients(self):
+        # Shared Memory Clients Announce Themselves In Their Own Slot (Their Id)
+        attached = set()
+        while len(attached) < self.NB_CARS:
+            self.transport.wait()
+            for slot in range(self.NB_CARS):
+                if slot in attached or not self.transport.pending(slot):
+                    continue
+                # Their Hello Has No Options: Every Car Drives On The Least Busy Map
+                map_id = self.least_busy_map()
+                car = CarServer(slot, self.transport.endpoint(slot), None, None, self.SPRITES, self.TRACKS[map_id],
+                                radar_engine=self.radar_engine, world=self.worlds.get(map_id), slot=slot,
+                                protocol="shared", profiler=self.profiler, collision=self.collision)
+                car.poll_action()  # Take The Hello, Answered By send_go
+                self.assign_map([slot], map_id)
+                attached.add(slot)
+                self.cars.append(car)
+                print("Server : New Car attached id: {} (map {})".format(slot, map_id))
+
+    def least_busy_map(self):
+        # The Hosted Map With The Fewest Cars, The First One On Ties
+        return min(self.MAPS, key=lambda map_id: self.map_cars[map_id])
+
+    def assign_map(self, slots, map_id):
+        for slot in slots:
+            self.car_maps[slot] = map_id
+        self.map_cars[map_id] += len(slots)
+
+    def ready_cars(self):
+        # Cars Whose Client Sent Something, Blocking Until There Is At Least One
+        if self.profiler is not None:
+            start = time.perf_counter()
+            ready = self.wait_ready_cars()
+            self.profiler.record("wait", start)
+            return ready
+        return self.wait_ready_cars()
+
+    def wait_ready_cars(self):
+        if self.transport is None:
+            # Frames Received Together With An Earlier One Wait In The Car's Reader: Ready Without Blocking
+            buffered = []
+            if self.buffered:
+                buffered = [car for car in self.cars if car in self.buffered and car not in self.held]
+            readable = [key.data for key, _ in self.selector.select(0 if buffered else None)]
+            return buffered + [car for car in readable if car not in self.buffered]
+
+        while True:
+            ready = [car for car in self.cars if car not in self.held and self.transport.pending(car.slot)]
+            if ready:
+                return ready
+            self.transport.wait()
+
+    def forget(self, car):
+        if self.selector is not None:
+            self.selector.unregister(car.conn)
+
+    def poll_action(self, car):
+        # The Car's Action (See CarServer.poll_action), Timed As "receive"
+        if self.profiler is None:
+            action = car.poll_action()
+        else:
+            start = time.perf_counter()
+            action = car.poll_action()
+            self.profiler.record("receive", start, car.car_id)
+
+        if car.isConnected and car.reader.has_message():
+            self.buffered.add(car)
+        else:
+            self.buffered.discard(car)
+        return action
+
+    def step_cars(self):
+        # Lockstep Tick: Serve Clients As Their Sockets Become Readable Until Every Car Sent
+        # Its Action (Resets Are Answered Right Away), Then Advance The Cars And Answer
+        waiting = set(self.cars)
+        stepped = []
+        while waiting:
+            for car in self.ready_cars():
+                if car not in waiting:
+                    continue
+
+                action = self.poll_action(car)
+                if not car.isConnected:
+                    self.forget(car)
+                    waiting.discard(car)
+                elif action is not None:
+                    waiting.discard(car)
+                    stepped.append((car, action))
+
+        self.advance(stepped)
+        self.remove_disconnected()
+
+    def step_cars_async(self):
+        # Async Tick: Advance Every Car Whose Action Already Arrived, Without Waiting For The Others
+        stepped = []
+        for car in self.ready_cars():
+            action = self.poll_action(car)
+            if not car.isConnected:
+                self.forget(car)
+            elif action is not None:
+                stepped.append((car, action))
+
+        self.advance(stepped)
+        self.remove_disconnected()
+        self.hold_fast_cars()
+
+    def advance(self, stepped):
+        # Apply The (car, action) Pairs, Advance Those Cars By One Step And Answer Them
+        profiler = self.profiler
+        if profiler is not None:
+            start = time.perf_counter()
+
+        # Batched Physics: One Step Per RaceWorld, Of All Its Cars That Sent An Action
+        batches = []
+        if self.worlds and stepped:
+            by_world = {}
+            for car, action in stepped:
+                by_world.setdefault(car.world, []).append((car, action))
+            for world, cars in by_world.items():
+                slots = np.concatenate([np.atleast_1d(car.slot) for car, _ in cars])
+                # The Observations The Actions Were Chosen On, Overwritten By The Step
+                observations = world.radar_dist[slots] if self.recorder is not None else None
+                world.step(np.concatenate([np.reshape(action, (-1, 2)) for _, action in cars]), slots)
+                batches.append((world, slots, observations))
+            if profiler is not None:
+                start = profiler.record("physics", start)
+        elif not self.worlds:
+            observations = []
+            for car, action in stepped:
+                if self.recorder is not None:
+                    observations.append([radar[1] for radar in car.radars])
+                car.action(action)
+                car.update()
+                if profiler is not None:
+                    start = profiler.record("physics", start, car.car_id)
+
+        for car, _ in stepped:
+            car.send_step()
+            car.steps += 1
+            if profiler is not None:
+                start = profiler.record("send", start, car.car_id)
+
+        # Record The Steps Once The Clients Have Their Answers
+        if self.recorder is not None and stepped:
+            if self.worlds:
+                for world, slots, observations in batches:
+                    self.recorder.record_world(self.tick, world, slots, observations)
+            else:
+                for (car, action), observation in zip(stepped, observations):
+                    self.recorder.record_car(self.tick, car, action, observation)
+            if profiler is not None:
+                profiler.record("record", start)
+
+    def remove_disconnected(self):
+        for car in self.cars:
+            if not car.isConnected:
+                self.held.discard(car)
+                self.buffered.discard(car)
+                if car.world is not None:
+                    car.world.active[car.slot] = False
+        self.cars = [car for car in self.cars if car.isConnected]
+
+    def hold_fast_cars(self):
+        # Stop Reading From Cars Too Far Ahead Of The Slowest One (Their Clients Then Wait For An Answer)
+        # And Resume The Ones That Are Back Within The Staleness Bound
+        if self.max_staleness is None or not self.cars:
+            return
+
+        slowest = min(car.steps for car in self.cars)
+        for car in self.cars:
+            ahead = car.steps - slowest >= self.max_staleness
+            if ahead and car not in self.held:
+                self.forget(car)
+                self.held.add(car)
+            elif not ahead and car in self.held:
+                if self.selector is not None:
+                    self.selector.register(car.conn, selectors.EVENT_READ, car)
+                self.held.discard(car)
+
+    def report_step_rates(self):
+        if self.report_every is None:
+            return
+        now = time.perf_counter()
+        if now - self.lastReportTime < self.report_every:
+            return
+
+        elapsed = now - self.lastReportTime
+        rates = {car.car_id: (car.steps - self.lastReportSteps.get(car, 0)) / elapsed for car in self.cars}
+        if self.reporter is not None:
+            self.reporter(rates)
+        else:
+            print("Server : {:.0f} steps/s ({}) | ".format(sum(rates.values()), self.tick_mode)
+                  + ", ".join("car {}: {:.0f}".format(car_id, rate) for car_id, rate in rates.items()))
+
+        self.lastReportTime = now
+        self.lastReportSteps = {car: car.steps for car in self.cars}
+
+    def end_tick(self):
+        self.tick += 1
+        if self.render_requested or (self.render_every and self.tick % self.render_every == 0):
+            self.render_requested = False
+            if self.profiler is not None:
+                start = time.perf_counter()
+                self.draw()
+                self.profiler.record("draw", start)
+            else:
+                self.draw()
+
+    def request_render(self, path=None):
+        # Draw A Frame At The End Of The Next Tick, Optionally Saved To `path`
+        self.render_path = path
+        self.render_requested = True
+
     def draw(self):
-        # Draw Map
-        self.screen.blit(self.MAP, (0, 0))
+        # With A Render Thread, Only Hand It The Current State If It Took The Last One
+        if self.render_thread:
+            snapshot = self.snapshots.writable()
+            if snapshot is None:
+                self.render_requested = self.render_path is not None  # Saved With A Later Snapshot
+                return
+            self.take_snapshot(snapshot)
+            self.snapshots.publish()
+            return
+
+        self.take_snapshot(self.snapshot)
+        self.renderer.draw(self.snapshot)
+        if self.headless:
+            return
 
-        # Draw Cars
-        for car in self.cars:
-            car.draw()
+        # Exit On Quit Event
+        if self.renderer.quit_requested():
+            sys.exit(0)
+
+        self.renderer.present()
+        if self.max_fps:
+            self.clock.tick(self.max_fps)  # 60 FPS By Default
+
+    def take_snapshot(self, snapshot):
+        # Only The Cars Of The Map Shown In The Window
+        if self.worlds:
+            snapshot.copy_world(self.worlds[self.MAPS[0]])
+        else:
+            track = self.TRACKS[self.MAPS[0]]
+            snapshot.copy_cars([car for car in self.cars if car.TRACK is track])
             # text = self.font.render("s: " + str(car.current_sector), True, (100, 100, 100))
             # text_rect = text.get_rect()
             # text_rect.center = (car.position[0], car.position[1])
@@ -109,49 +484,33 @@ class RaceServer:
             # if car.sectorReward > self.sectorReward :
             #     self.sectorReward = car.sectorReward
 
-
         # Display Info
         self.set_best_reward()
         self.set_fps()
-        self.display_info()
-
-        # Exit On Quit Event
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit(0)
-            elif event.type == pygame.KEYUP:
-                if event.key == pygame.K_ESCAPE:
-                    sys.exit(0)
-
-        pygame.display.flip()
-        self.clock.tick(60)  # 60 FPS
-
-    def display_info(self):
-        # Display Info
-        text = self.font.render("Time: " + str(round(time.time() - self.time)) + "s", True, (0, 0, 0))
-        text_rect = text.get_rect()
-        text_rect.center = (900, 460)
-        self.screen.blit(text, text_rect)
-
-        text = self.font.render("Best Reward: " + str(self.best_reward), True, (0, 0, 0))
-        text_rect = text.get_rect()
-        text_rect.center = (900, 500)
-        self.screen.blit(text, text_rect)
-
-        text = self.font.render("FPS: " + str(round(sum(self.fpsBuffer) / len(self.fpsBuffer))), True, (0, 0, 0))
-        text_rect = text.get_rect()
-        text_rect.center = (900, 540)
-        self.screen.blit(text, text_rect)
+        snapshot.seconds = round(time.time() - self.time)
+        snapshot.best_reward = self.best_reward
+        snapshot.ticks_per_second = round(sum(self.fpsBuffer) / len(self.fpsBuffer)) if self.fpsBuffer else 0
+        snapshot.path = self.render_path
+        self.render_path = None
 
     def set_fps(self):
-        if len(self.fpsBuffer) == 100:
-            self.fpsBuffer.pop(0)
-
-        self.fpsBuffer.append(1000 / (round(time.time() * 1000) - self.lastFrameTime))
-        self.lastFrameTime = round(time.time() * 1000)
+        # Simulation Ticks Per Second Since The Last Frame
+        now = time.perf_counter()
+        if self.tick > self.lastFrameTick and now > self.lastFrameTime:
+            if len(self.fpsBuffer) == 100:
+                self.fpsBuffer.pop(0)
+            self.fpsBuffer.append((self.tick - self.lastFrameTick) / (now - self.lastFrameTime))
+        self.lastFrameTime = now
+        self.lastFrameTick = self.tick
 
 
     def set_best_reward(self):
+        if self.worlds:
+            for world in self.worlds.values():
+                if world.active.any():
+                    self.best_reward = max(self.best_reward, round(world.reward[world.active].max(), 2))
+            return
+
         for car in self.cars:
             actual_reward = car.get_reward()
             if actual_reward > self.best_reward:
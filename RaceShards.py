@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from Constants import HOST
+
+REPORT_EVERY = 5  # Seconds Between Two Step Rate Reports Of A Shard
+STALE_REPORTS = 3  # A Running Shard Silent For This Many Reports Is Reported As Stalled
+
+
+def spread_cpus(nb_shards):
+    # The CPUs This Process May Run On, Split Into `nb_shards` Contiguous Sets (For RaceShards(cpus=...))
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < nb_shards:
+        raise ValueError("{} CPUs can't be split between {} shards".format(len(cpus), nb_shards))
+    return [cpus[shard * len(cpus) // nb_shards:(shard + 1) * len(cpus) // nb_shards] for shard in range(nb_shards)]
+
+
+def run_shard(index, nb_cars, map_id, cpus, ports, reports, report_every, server_options):
+    # Entry Point Of A Shard Process: A Headless RaceServer On A Free Port, Pinned To `cpus` When Given
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+    from RaceServer import RaceServer
+
+    def reporter(rates):
+        reports.put((index, time.time(), len(rates), sum(rates.values())))
+
+    server = RaceServer(nb_cars, map_id, headless=True, port=0, report_every=report_every, reporter=reporter,
+                        **server_options)
+    ports.put((index, server.port))
+    server.run()
+
+
+class RaceShards:
+    """
+    Several headless RaceServers, each in its own process (its own
+    interpreter and GIL), so the simulation scales with the cores instead
+    of sharing the learner's process.
+
+    Every shard listens on a port picked by the system and may be pinned
+    to a set of CPUs. The cars are spread over the shards by rank:
+    address(rank) is where the client of car `rank` connects. Shards
+    report their step rate every `report_every` seconds, gathered by
+    status() and printed by a monitor thread.
+    """
+
+    def __init__(self, nb_cars, nb_shards, map_id=1, cpus=None, report_every=REPORT_EVERY,
+                 start_method="forkserver", **server_options):
+        if not 1 <= nb_shards <= nb_cars:
+            raise ValueError("{} shards can't share {} cars".format(nb_shards, nb_cars))
+        if cpus is not None and len(cpus) != nb_shards:
+            raise ValueError("{} CPU sets given for {} shards".format(len(cpus), nb_shards))
+        if cpus is not None and not hasattr(os, "sched_setaffinity"):
+            raise ValueError("Pinning shards to CPUs is not supported on this system")
+        self.nb_cars = nb_cars
+        self.nb_shards = nb_shards
+        self.map_id = map_id
+        self.cpus = cpus  # One Set Of CPU Ids Per Shard, None = Not Pinned
+        self.report_every = report_every
+        self.server_options = server_options  # Passed To Every RaceServer (maps, tick_mode, ...)
+        self.context = multiprocessing.get_context(start_method)
+
+        self.processes = []
+        self.ports = [None] * nb_shards
+        self.reports = None
+        self.last_reports = [None] * nb_shards  # (time, cars, steps/s) Of Every Shard
+        self.monitor = None
+
+    def shard_of(self, rank):
+        return rank % self.nb_shards
+
+    def shard_cars(self, shard):
+        return len(range(shard, self.nb_cars, self.nb_shards))
+
+    def address(self, rank):
+        # (host, port) Of The Shard Simulating Car `rank`
+        return HOST, self.ports[self.shard_of(rank)]
+
+    def start(self, timeout=60):
+        # Start Every Shard, Returns Once All Of Them Listen
+        ports = self.context.Queue()
+        self.reports = self.context.Queue()
+        for shard in range(self.nb_shards):
+            cpus = None if self.cpus is None else set(self.cpus[shard])
+            process = self.context.Process(target=run_shard, name="RaceShard-{}".format(shard), daemon=True,
+                                           args=(shard, self.shard_cars(shard), self.map_id, cpus, ports,
+                                                 self.reports, self.report_every, self.server_options))
+            process.start()
+            self.processes.append(process)
+
+        for _ in range(self.nb_shards):
+            shard, port = ports.get(timeout=timeout)
+            self.ports[shard] = port
+        print("Shards : {} servers listening on ports {}".format(self.nb_shards, self.ports))
+
+        if self.report_every is not None:
+            self.monitor = threading.Thread(target=self.print_reports, daemon=True)
+            self.monitor.start()
+        return self
+
+    def collect(self):
+        # Take The Reports Sent Since The Last Call
+        while True:
+            try:
+                shard, sent, cars, rate = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            self.last_reports[shard] = (sent, cars, rate)
+
+    def status(self):
+        # Health And Throughput Of Every Shard, Then Of All Of Them
+        self.collect()
+        now = time.time()
+        shards = []
+        for shard, process in enumerate(self.processes):
+            report = self.last_reports[shard]
+            if not process.is_alive():
+                state = "stopped" if process.exitcode == 0 else "failed ({})".format(process.exitcode)
+            elif report is None:
+                state = "starting"
+            elif now - report[0] > STALE_REPORTS * self.report_every:
+                state = "stalled"
+            else:
+                state = "running"
+            shards.append({"shard": shard, "port": self.ports[shard], "state": state,
+                           "cars": 0 if report is None else report[1],
+                           "steps_per_second": 0 if report is None else report[2]})
+        total = {"running": sum(shard["state"] == "running" for shard in shards),
+                 "cars": sum(shard["cars"] for shard in shards),
+                 "steps_per_second": sum(shard["steps_per_second"] for shard in shards)}
+        return shards, total
+
+    def print_reports(self):
+        # Monitor Thread, Until Every Shard Stopped
+        while any(process.is_alive() for process in self.processes):
+            time.sleep(self.report_every)
+            shards, total = self.status()
+            print("Shards : {:.0f} steps/s, {} cars, {}/{} running | ".format(
+                total["steps_per_second"], total["cars"], total["running"], self.nb_shards)
+                  + ", ".join("{}: {:.0f} ({})".format(shard["shard"], shard["steps_per_second"], shard["state"])
+                              for shard in shards))
+
+    def join(self, timeout=None):
+        # Shards Stop Once All Their Clients Disconnected, Killed If Still Running After `timeout`
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
@@ -0,0 +1,94 @@
+import inspect
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from Constants import RADAR_MAX_LENGTH
+from MapCache import load_track
+from RaceWorld import RaceWorld, RADAR_DEGREES
+
+
+class RaceVecEnv(VecEnv):
+    """
+    Vectorized environment running num_envs cars of a RaceWorld in the
+    learner's own process: no RaceServer, no sockets, no worker processes.
+
+    Drop-in replacement for a SubprocVecEnv of CarClient: same spaces, same
+    observations and rewards, and done cars are reset automatically with
+    their last observation in infos["terminal_observation"], as SB3 expects.
+    """
+
+    def __init__(self, num_envs, nb_map=1, radar_engine="sphere", car_collisions=False, car_radars=False,
+                 collision="corners"):
+        self.world = RaceWorld(load_track('assets/map{}.png'.format(nb_map)), num_envs, radar_engine,
+                               car_collisions, car_radars, collision)
+        self.actions = np.zeros((num_envs, 2), dtype=np.float32)
+        self.render_mode = None
+
+        # Same Spaces As CarClient
+        action_space = spaces.Box(low=-1, high=1, shape=[2], dtype=np.float32)
+        observation_space = spaces.Box(low=0, high=1, shape=[len(RADAR_DEGREES)], dtype=np.float32)
+        super(RaceVecEnv, self).__init__(num_envs, observation_space, action_space)
+
+    def get_observations(self):
+        return (self.world.radar_dist / RADAR_MAX_LENGTH).astype(np.float32)
+
+    def reset(self):
+        self.world.reset()
+        self._reset_seeds()
+        self._reset_options()
+        return self.get_observations()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions, dtype=np.float32).reshape(self.num_envs, 2)
+
+    def step_wait(self):
+        self.world.step(self.actions)
+
+        obs = self.get_observations()
+        rewards = self.world.reward.astype(np.float32)
+        dones = ~self.world.alive
+        infos = [{} for _ in range(self.num_envs)]
+
+        done_slots = np.flatnonzero(dones)
+        if done_slots.size:
+            for slot in done_slots:
+                infos[slot]["terminal_observation"] = obs[slot].copy()  # Its Row Is Overwritten By The Reset
+                infos[slot]["TimeLimit.truncated"] = False
+            self.world.reset(done_slots)
+            obs[done_slots] = self.get_observations()[done_slots]
+
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        # Per Car Arrays Of The World (e.g. "distance", "alive") Are Read Per Index
+        indices = self._get_indices(indices)
+        value = getattr(self.world, attr_name, None)
+        if isinstance(value, np.ndarray) and len(value) == self.num_envs:
+            return [value[i] for i in indices]
+        return [getattr(self, attr_name) for _ in indices]
+
+    def set_attr(self, attr_name, value, indices=None):
+        indices = self._get_indices(indices)
+        array = getattr(self.world, attr_name, None)
+        if isinstance(array, np.ndarray) and len(array) == self.num_envs:
+            array[list(indices)] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Methods Of The World Taking Slots (e.g. "reset", "get_reward") Are Called Per Index With slots=index,
+        # Others On This Environment, Unknown Ones Raise AttributeError
+        indices = self._get_indices(indices)
+        method = getattr(self.world, method_name, None)
+        if callable(method) and "slots" in inspect.signature(method).parameters:
+            return [method(*method_args, slots=i, **method_kwargs) for i in indices]
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in indices]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
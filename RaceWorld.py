@@ -0,0 +1,302 @@
+import time
+
+import numpy as np
+
+from CarServer import (WIDTH, CAR_SIZE_X, CAR_SIZE_Y, MIN_SPEED, MAX_SPEED, MAX_THROTTLE, MAX_STEERING,
+                       RADAR_MAX_LENGTH, START_POSITION)
+from Collision import COLLISION_MODES, CRASH_STOPS, sweep_segments
+from Geometry import (CORNER_DEGREES, CORNER_TABLE, HEADING_DEGREES, HEADING_TABLE, RADAR_DEGREES, RADAR_TABLE,
+                      directions)
+from Radar import cast_rays
+from SpatialHash import SpatialHash
+from Sprites import draw_radar
+from TrackMap import BORDER, SECTOR1, SECTOR2, SECTOR3, OUT_OF_BOUNDS, RADAR_STOPS
+
+# Car-To-Car Contacts: Other Cars Are Discs Of CAR_RADIUS Around Their Center
+# Cars Are Ghosts For Their First CONTACT_GRACE Ticks After A Reset (They All Start On The Same Spot)
+CAR_RADIUS = 20
+CONTACT_GRACE = 10
+
+
+class RaceWorld:
+    """
+    Physics of every car of a race, stored as one NumPy array per attribute.
+
+    A tick of any subset of the cars is a handful of vectorized passes
+    (action, movement, corners, collision, radars, reward) with the same
+    results as CarServer.action + CarServer.update + CarServer.get_reward.
+    Cars are addressed by their slot, the index in the arrays.
+
+    Cars ignore each other unless `car_collisions` (a car touching another
+    one crashes) or `car_radars` (radars stop on other cars) is set. Only
+    neighbours are tested, found in a SpatialHash of the car centers
+    rebuilt every tick.
+
+    With collision="swept", the corners are swept from their previous to
+    their new position (see Collision), and `impact` holds the time of
+    impact of the last step of every car.
+    """
+
+    def __init__(self, track, nb_cars, radar_engine="sphere", car_collisions=False, car_radars=False,
+                 collision="corners"):
+        self.TRACK = track
+        self.nb_cars = nb_cars
+        self.radar_engine = radar_engine
+        if radar_engine == "sphere":
+            track.distance_field(RADAR_STOPS)  # Precompute Before The Race Starts
+
+        if collision not in COLLISION_MODES:
+            raise ValueError("Unknown collision mode: '{}'".format(collision))
+        self.collision = collision
+        if collision == "swept" and radar_engine == "sphere":
+            track.distance_field(CRASH_STOPS)
+
+        # Radars Reach Cars Up To RADAR_MAX_LENGTH + CAR_RADIUS Away, Collisions Only Touching Ones
+        self.car_collisions = car_collisions
+        self.car_radars = car_radars
+        self.cars_grid = None
+        if car_collisions or car_radars:
+            self.cars_grid = SpatialHash(RADAR_MAX_LENGTH + CAR_RADIUS if car_radars else 2 * CAR_RADIUS)
+
+        self.active = np.zeros(nb_cars, dtype=bool)  # Slots Used By A Connected Car
+        self.actions = np.zeros((nb_cars, 2), dtype=np.float64)  # Last [steering, throttle] Per Slot
+
+        self.position = np.zeros((nb_cars, 2), dtype=np.float64)
+        self.center = np.zeros((nb_cars, 2), dtype=np.float64)
+        self.angle = np.zeros(nb_cars, dtype=np.float64)
+        # Directions Of The Angle: Rows Of The Geometry Tables, Or Computed When The Angle Is Off Its Bin
+        self.heading = np.repeat(HEADING_TABLE[:1], nb_cars, axis=0)
+        self.corner_directions = np.repeat(CORNER_TABLE[:1], nb_cars, axis=0)
+        self.radar_directions = np.repeat(RADAR_TABLE[:1], nb_cars, axis=0)
+        self.speed = np.zeros(nb_cars, dtype=np.float64)
+        self.speed_set = np.zeros(nb_cars, dtype=bool)
+
+        self.radar_end = np.zeros((nb_cars, len(RADAR_DEGREES), 2), dtype=np.int64)
+        self.radar_dist = np.zeros((nb_cars, len(RADAR_DEGREES)), dtype=np.int64)
+
+        self.alive = np.ones(nb_cars, dtype=bool)
+        self.impact = np.ones(nb_cars, dtype=np.float64)  # Fraction Of The Last Step Done Before Crashing
+        self.distance = np.zeros(nb_cars, dtype=np.float64)
+        self.time = np.zeros(nb_cars, dtype=np.int64)
+
+        self.current_sector = np.zeros(nb_cars, dtype=np.int64)
+        self.turn_count = np.ones(nb_cars, dtype=np.int64)
+
+        self.reward = np.zeros(nb_cars, dtype=np.float64)
+        self.sector_reward = np.zeros(nb_cars, dtype=np.float64)
+        self.dist_reward = np.zeros(nb_cars, dtype=np.float64)
+
+        self.profiler = None  # Times The Radars And The Reward When Set (See PhaseProfiler)
+
+    def as_slots(self, slots):
+        if slots is None:
+            return np.arange(self.nb_cars)
+        return np.atleast_1d(np.asarray(slots, dtype=np.int64))
+
+    def reset(self, slots=None):
+        # Put Cars Back On The Starting Position And Run Their First Tick
+        slots = self.as_slots(slots)
+        self.active[slots] = True
+
+        self.position[slots] = START_POSITION
+        self.angle[slots] = 0
+        self.heading[slots] = HEADING_TABLE[0]
+        self.corner_directions[slots] = CORNER_TABLE[0]  # The Swept Corners Of The First Tick Start From This Pose
+        self.radar_directions[slots] = RADAR_TABLE[0]
+        self.speed[slots] = 0
+        self.speed_set[slots] = False
+
+        self.center[slots, 0] = self.position[slots, 0] + CAR_SIZE_X / 2
+        self.center[slots, 1] = self.position[slots, 1] + CAR_SIZE_Y / 2
+
+        self.alive[slots] = True
+        self.distance[slots] = 0
+        self.time[slots] = 0
+
+        self.current_sector[slots] = 0
+        self.turn_count[slots] = 1
+
+        self.reward[slots] = 0
+        self.sector_reward[slots] = 0
+        self.dist_reward[slots] = 0
+
+        self.update(slots)
+
+    def step(self, actions, slots=None):
+        # Apply One [steering, throttle] Action Per Slot Then Advance Those Cars By One Tick
+        slots = self.as_slots(slots)
+        self.actions[slots] = np.asarray(actions, dtype=np.float64).reshape(len(slots), 2)
+        self.action(self.actions[slots], slots)
+        self.update(slots)
+        if self.profiler is not None:
+            start = time.perf_counter()
+            self.get_reward(slots)
+            self.profiler.record("reward", start)
+        else:
+            self.get_reward(slots)
+
+    def action(self, actions, slots):
+        self.angle[slots] += actions[:, 0] * MAX_STEERING
+        self.speed[slots] = np.clip(self.speed[slots] + actions[:, 1] * MAX_THROTTLE, MIN_SPEED, MAX_SPEED)
+
+    def update(self, slots):
+        # Set The Speed To MIN_SPEED For The First Time
+        first = slots[~self.speed_set[slots]]
+        self.speed[first] = MIN_SPEED
+        self.speed_set[first] = True
+
+        # Corners Before Moving, Swept Towards The New Ones
+        previous = self.calculate_corners(slots) if self.collision == "swept" else None
+
+        # Move Into The Right Direction, Don't Let The Car Go Closer Than 20px To The Edge
+        angles = self.angle[slots]
+        self.heading[slots] = heading = directions(HEADING_TABLE, HEADING_DEGREES, angles)
+        self.corner_directions[slots] = directions(CORNER_TABLE, CORNER_DEGREES, angles)
+        self.radar_directions[slots] = directions(RADAR_TABLE, RADAR_DEGREES, angles)
+        speed = self.speed[slots]
+        self.position[slots, 0] = np.clip(self.position[slots, 0] + heading[:, 0] * speed, 20, WIDTH - 120)
+        self.position[slots, 1] = np.clip(self.position[slots, 1] + heading[:, 1] * speed, 20, WIDTH - 120)
+
+        # Increase Distance and Time
+        self.distance[slots] += speed
+        self.time[slots] += 1
+
+        # Calculate New Center
+        self.center[slots] = self.position[slots].astype(np.int64) + [CAR_SIZE_X / 2, CAR_SIZE_Y / 2]
+
+        self.check_collision(slots, previous)
+        if self.profiler is not None:
+            start = time.perf_counter()
+            self.check_radars(slots)
+            self.profiler.record("radar", start)
+        else:
+            self.check_radars(slots)
+
+    def calculate_corners(self, slots):
+        # Four Corners Per Car, Shape (len(slots), 4, 2)
+        length = 0.5 * CAR_SIZE_X
+        return self.center[slots, np.newaxis, :] + self.corner_directions[slots] * length
+
+    def check_collision(self, slots, previous=None):
+        # If Any Corner Touches Border Color (Or Leaves The Map) -> Crash
+        corners = self.calculate_corners(slots)
+        pixels = corners.astype(np.int64)
+        labels = self.TRACK.labels_at(pixels[..., 0], pixels[..., 1])
+        self.alive[slots] = ~np.any((labels == BORDER) | (labels == OUT_OF_BOUNDS), axis=1)
+        self.impact[slots] = 1.0
+
+        if previous is not None:
+            # Swept: The First Border Pixel Crossed By Any Corner During The Step
+            impact = sweep_segments(self.TRACK, previous.reshape(-1, 2), corners.reshape(-1, 2), self.radar_engine)
+            self.impact[slots] = impact.reshape(len(slots), -1).min(axis=1)
+            self.alive[slots] &= self.impact[slots] == 1
+
+    def check_radars(self, slots):
+        # Cast Every Radar Of Every Car At Once
+        cx = np.repeat(self.center[slots, 0], len(RADAR_DEGREES))
+        cy = np.repeat(self.center[slots, 1], len(RADAR_DEGREES))
+        angles = (360 - (self.angle[slots, np.newaxis] + RADAR_DEGREES)).ravel()
+        rays = self.radar_directions[slots].reshape(-1, 2)
+        x, y, label, length = cast_rays(self.TRACK, cx, cy, angles, RADAR_MAX_LENGTH, RADAR_STOPS,
+                                        self.radar_engine, (rays[:, 0], rays[:, 1]))
+
+        shape = (len(slots), len(RADAR_DEGREES))
+        self.radar_end[slots] = np.stack((x, y), axis=-1).reshape(shape + (2,))
+        dist = np.sqrt((x - cx) ** 2 + (y - cy) ** 2).astype(np.int64).reshape(shape)
+        self.radar_dist[slots] = dist
+
+        # Sector Lines Are Seen Radar After Radar, In The Same Order As CarServer
+        # Except Behind A Car Stopping The Radar First
+        label = label.reshape(shape)
+        length = length.reshape(shape)
+        if self.cars_grid is not None:
+            self.check_cars(slots)
+            length = np.where(self.radar_dist[slots] < dist, 0, length)
+        if not np.any((label == SECTOR1) | (label == SECTOR2) | (label == SECTOR3)):
+            return
+        for r in range(len(RADAR_DEGREES)):
+            self.check_sector(slots[length[:, r] > 0], label[length[:, r] > 0, r])
+
+    def check_cars(self, slots):
+        # Crash Into And See The Other Cars Near The Ones Of `slots`, Once Their Radars Saw The Track
+        # Crashed Cars Are Wrecks Waiting For Their Reset: Neither Seen Nor Hit
+        solid = np.flatnonzero(self.active & self.alive & (self.time >= CONTACT_GRACE))
+        if len(solid) == 0:
+            return
+        self.cars_grid.build(self.center[solid])
+        queries, others = self.cars_grid.candidates(self.center[slots])
+        others = solid[others]
+        cars = slots[queries]
+        pairs = cars != others
+        queries, cars, others = queries[pairs], cars[pairs], others[pairs]
+        offset = self.center[others] - self.center[cars]
+        distance2 = np.einsum("ij,ij->i", offset, offset)
+
+        if self.car_collisions:
+            touching = (distance2 < (2 * CAR_RADIUS) ** 2) & (self.time[cars] >= CONTACT_GRACE)
+            self.alive[cars[touching]] = False
+
+        if not self.car_radars or len(cars) == 0:
+            return
+        # Ray / Disc Intersections, Shape (Pairs, Radars): Distance Along The Ray Of The Nearest Point Of The Disc
+        along = np.einsum("ijk,ik->ij", self.radar_directions[cars], offset)
+        across2 = distance2[:, np.newaxis] - along ** 2
+        hit = (across2 <= CAR_RADIUS ** 2) & (along > 0)
+        pair, radar = np.nonzero(hit)
+        if len(pair) == 0:
+            return
+        entry = np.maximum(along[pair, radar] - np.sqrt(CAR_RADIUS ** 2 - across2[pair, radar]), 0)
+
+        # Shorten The Radars Stopping On A Car Before The Track
+        length = self.radar_dist[slots].astype(np.float64)
+        np.minimum.at(length, (queries[pair], radar), entry)
+        shorter = length < self.radar_dist[slots]
+        end = (self.center[slots, np.newaxis, :] + self.radar_directions[slots] * length[..., np.newaxis]).astype(np.int64)
+        self.radar_end[slots] = np.where(shorter[..., np.newaxis], end, self.radar_end[slots])
+        self.radar_dist[slots] = np.where(shorter, length.astype(np.int64), self.radar_dist[slots])
+
+    def check_sector(self, slots, label):
+        sector = self.current_sector[slots]
+        turn_count = self.turn_count[slots]
+
+        new_sector = (label == SECTOR1) & (sector == 2)
+        new_sector |= (label == SECTOR2) & (sector == 3)
+        lap = (label == SECTOR3) & (sector == 1)
+        new_sector |= lap
+        turn_count += lap
+
+        sector = np.where(label == SECTOR1, 1, sector)
+        sector = np.where(label == SECTOR2, 2, sector)
+        sector = np.where(label == SECTOR3, 3, sector)
+
+        self.current_sector[slots] = sector
+        self.turn_count[slots] = turn_count
+
+        rewarded = slots[new_sector]
+        self.sector_reward[rewarded] += (sector[new_sector] * 1000
+                                         / (self.time[rewarded] / turn_count[new_sector]))
+
+    def get_reward(self, slots=None):
+        slots = self.as_slots(slots)
+        distance = self.distance[slots]
+        time = self.time[slots]
+        self.dist_reward[slots] = distance / 1000 + distance / (50 * np.maximum(time, 1))
+        self.reward[slots] = self.dist_reward[slots] - self.sector_reward[slots]
+        return self.reward[slots]
+
+    def is_alive(self, slots=None):
+        slots = self.as_slots(slots)
+        return self.alive[slots]
+
+    def draw(self, screen, sprites, radars=True):
+        # Returns The Rectangles Drawn Over
+        rects = []
+        for slot in np.flatnonzero(self.active):
+            # Draw Sprite (Pre-Rotated, From The Shared SpriteCache)
+            rects.append(screen.blit(sprites.rotated(self.angle[slot]), self.position[slot]))
+
+            # Draw Radars
+            if radars:
+                center = self.center[slot]
+                rects.extend(draw_radar(screen, center, position) for position in self.radar_end[slot])
+        return rects
@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+
+from TrackMap import OUT_OF_BOUNDS, RADAR_STOPS
+
+# Available Ray Casting Engines, Selectable By Name (See RADAR_ENGINES)
+#  - march:  Step One Pixel At A Time (Reference Implementation)
+#  - sphere: Jump Ahead By The Distance To The Nearest Stop (Sphere Tracing)
+# Both Return Exactly The Same Hit Pixel
+
+
+# cast_rays Finishes The Last Few Rays One By One With The Scalar Engines
+# Once The Per Iteration NumPy Overhead Costs More Than The Rays Themselves
+SCALAR_TAIL = 8
+
+
+def march_ray(track, cx, cy, angle, max_length, stops=RADAR_STOPS, length=0, direction=None):
+    # Returns (x, y, label, length) Of The Last Pixel Visited By The Ray
+    # The Ray Can Be Resumed From Any `length` Known To Be Free
+    # A Precomputed (cos, sin) Of The Angle Can Be Given As `direction` (See Geometry)
+    cells = track.cells
+    width = track.width
+    height = track.height
+    dx, dy = direction if direction is not None else (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+
+    x = int(cx + dx * length)
+    y = int(cy + dy * length)
+    label = cells[y * width + x] if 0 <= x < width and 0 <= y < height else OUT_OF_BOUNDS
+
+    while label not in stops and length < max_length:
+        length = length + 1
+        x = int(cx + dx * length)
+        y = int(cy + dy * length)
+        label = cells[y * width + x] if 0 <= x < width and 0 <= y < height else OUT_OF_BOUNDS
+
+    return x, y, label, length
+
+
+def trace_ray(track, cx, cy, angle, max_length, stops=RADAR_STOPS, length=0, direction=None):
+    # Same Result As march_ray, But Skips Every Integer Length That The Distance
+    # Field Proves Free: From A Pixel At Distance d Of The Nearest Stop, The Pixels
+    # Sampled At The Next d - 1 Lengths Are All Closer Than d (Truncation Included)
+    # `stops` Must Contain OUT_OF_BOUNDS So The Field Is Never Read Off The Map
+    cells = track.cells
+    distances = track.distance_cells(stops)
+    width = track.width
+    height = track.height
+    dx, dy = direction if direction is not None else (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+
+    x = int(cx + dx * length)
+    y = int(cy + dy * length)
+    label = cells[y * width + x] if 0 <= x < width and 0 <= y < height else OUT_OF_BOUNDS
+
+    while label not in stops and length < max_length:
+        length = length + min(max(distances[y * width + x] - 1, 1), max_length - length)
+        x = int(cx + dx * length)
+        y = int(cy + dy * length)
+        label = cells[y * width + x] if 0 <= x < width and 0 <= y < height else OUT_OF_BOUNDS
+
+    return x, y, label, length
+
+
+def cast_rays(track, cx, cy, angles, max_length, stops=RADAR_STOPS, engine="sphere", directions=None):
+    # Vectorized Version Of march_ray / trace_ray For Arrays Of Rays
+    # Returns (x, y, label, length) Arrays With The Same Values As The Scalar Engines
+    # `directions` Optionally Gives The Precomputed (cos, sin) Arrays Of The Angles
+    width = track.width
+    is_stop = np.zeros(256, dtype=bool)
+    is_stop[list(stops)] = True
+    if engine == "sphere":
+        distances = np.frombuffer(track.distance_cells(stops), dtype=np.uint8)
+    elif engine != "march":
+        raise ValueError("Unknown radar engine: '{}'".format(engine))
+
+    cx = np.asarray(cx, dtype=np.float64)
+    cy = np.asarray(cy, dtype=np.float64)
+    angles = np.asarray(angles, dtype=np.float64)
+    if directions is not None:
+        dx, dy = (np.asarray(d, dtype=np.float64) for d in directions)
+    else:
+        dx = np.cos(np.radians(angles))
+        dy = np.sin(np.radians(angles))
+
+    length = np.zeros(angles.shape, dtype=np.int64)
+    x = (cx + dx * length).astype(np.int64)
+    y = (cy + dy * length).astype(np.int64)
+    label = track.labels_at(x, y)
+
+    todo = np.flatnonzero(~is_stop[label] & (length < max_length))
+    while todo.size:
+        if todo.size <= SCALAR_TAIL:
+            cast_ray = RADAR_ENGINES[engine]
+            for i in todo:
+                x[i], y[i], label[i], length[i] = cast_ray(track, cx[i], cy[i], angles[i], max_length, stops,
+                                                           int(length[i]), (float(dx[i]), float(dy[i])))
+            break
+
+        if engine == "sphere":
+            step = distances[y[todo] * width + x[todo]].astype(np.int64) - 1
+            step = np.minimum(np.maximum(step, 1), max_length - length[todo])
+        else:
+            step = 1
+        length[todo] += step
+        x[todo] = (cx[todo] + dx[todo] * length[todo]).astype(np.int64)
+        y[todo] = (cy[todo] + dy[todo] * length[todo]).astype(np.int64)
+        label[todo] = track.labels_at(x[todo], y[todo])
+        todo = todo[~is_stop[label[todo]] & (length[todo] < max_length)]
+
+    return x, y, label, length
+
+
+RADAR_ENGINES = {
+    "march": march_ray,
+    "sphere": trace_ray,
+}
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pygame
+
+from CarServer import CarServer
+from Constants import CAR_SIZE_X, CAR_SIZE_Y, HEIGHT, RADAR_MAX_LENGTH, WIDTH
+from Geometry import car_directions
+from RaceRecorder import INDEX_FILE, RECORD_DTYPE
+from Sprites import get_sprite_cache
+
+
+class Recording:
+    """
+    A directory written by a RaceRecorder. Chunks are memory-mapped when
+    iterated, so only the records actually read are loaded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            self.meta = json.load(f)
+
+    def __len__(self):
+        return sum(chunk["records"] for chunk in self.meta["chunks"])
+
+    def chunks(self):
+        # The Recorded Part Of Every Chunk, Memory-Mapped
+        for chunk in self.meta["chunks"]:
+            records = np.load(os.path.join(self.directory, chunk["file"]), mmap_mode="r")
+            if records.dtype != RECORD_DTYPE:
+                raise ValueError("{}: unexpected record type {}".format(chunk["file"], records.dtype))
+            yield records[:chunk["records"]]
+
+    def ticks(self):
+        # (tick, records) Of Every Tick In Order, The Records Of A Tick Being Written Together
+        pending = None
+        for records in self.chunks():
+            if pending is not None:
+                records = np.concatenate((pending, records))
+            starts = np.flatnonzero(np.diff(records["tick"])) + 1
+            bounds = np.concatenate(([0], starts, [len(records)]))
+            for begin, end in zip(bounds[:-2], bounds[1:-1]):
+                yield int(records["tick"][begin]), records[begin:end]
+            pending = np.array(records[bounds[-2]:])  # The Last Tick May Continue In The Next Chunk
+        if pending is not None and len(pending):
+            yield int(pending["tick"][0]), pending
+
+    def maps(self):
+        # Paths Of The Maps Of The Race, The First One Being Shown By The Server
+        return self.meta.get("maps", [self.meta.get("map", "assets/map1.png")])
+
+    def slot_maps(self):
+        # Index In maps() Of The Map Of Every Slot (Races On One Map Only Record None)
+        maps = self.maps()
+        car_maps = self.meta.get("car_maps") or [maps[0]] * self.meta.get("nb_cars", 0)
+        return np.array([maps.index(path) if path in maps else -1 for path in car_maps], dtype=np.int64)
+
+    def records(self):
+        # Every Record, In Memory
+        chunks = list(self.chunks())
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORD_DTYPE)
+
+    def dataset(self):
+        """
+        Columns of every step, grouped by episode (one car from a reset to
+        the next) in tick order: the observation the client chose its action
+        on, the action, the reward and terminal flag of the step and the
+        observation after it (next_observations), the pose of the car and
+        its map (an index in maps()).
+        """
+        records = self.records()
+        records = records[np.lexsort((records["tick"], records["car"]))]
+
+        # A New Episode Starts With Every Car And Whenever Its Step Counter Does Not Increase
+        starts = np.ones(len(records), dtype=bool)
+        starts[1:] = (records["car"][1:] != records["car"][:-1]) | (records["time"][1:] <= records["time"][:-1])
+
+        return {
+            "observations": records["observation"].astype(np.float32) / RADAR_MAX_LENGTH,
+            "actions": np.stack((records["steering"], records["throttle"]), axis=-1),
+            "next_observations": records["radars"].astype(np.float32) / RADAR_MAX_LENGTH,
+            "rewards": records["reward"].copy(),
+            "terminals": records["terminated"].astype(bool),
+            "episode": np.cumsum(starts) - 1,
+            "car": records["car"].copy(),
+            "map": self.slot_maps()[records["car"]] if len(records) else np.zeros(0, dtype=np.int64),
+            "tick": records["tick"].copy(),
+            "x": records["x"].copy(),
+            "y": records["y"].copy(),
+            "angle": records["angle"].copy(),
+            "speed": records["speed"].copy(),
+            "sector": records["sector"].copy(),
+        }
+
+    def export(self, path):
+        # Columnar Dataset In A Compressed .npz (See dataset)
+        np.savez_compressed(path, **self.dataset())
+
+
+def restore(car, record):
+    # Put A CarServer In The State Of A Record, For Drawing
+    car.position = [float(record["x"]), float(record["y"])]
+    car.angle = float(record["angle"])
+    car.directions = car_directions(car.angle)
+    car.center = [int(car.position[0]) + CAR_SIZE_X / 2, int(car.position[1]) + CAR_SIZE_Y / 2]
+    car.radars = [[(car.center[0] + dx * dist, car.center[1] + dy * dist), int(dist)]
+                  for (dx, dy), dist in zip(car.directions[2], record["radars"])]
+
+
+def replay(recording, fps=60, shown_map=0):
+    # Draw Every Recorded Tick Again Through CarServer.draw, At `fps` Ticks Per Second
+    # Only The Cars Of The Map `shown_map` (An Index In recording.maps()) Are Drawn
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+    game_map = pygame.image.load(recording.maps()[shown_map]).convert()
+    shown = recording.slot_maps() == shown_map
+    sprites = get_sprite_cache('assets/car.png', (CAR_SIZE_X, CAR_SIZE_Y))
+    clock = pygame.time.Clock()
+
+    cars = {}  # Slot -> CarServer
+    for tick, records in recording.ticks():
+        screen.blit(game_map, (0, 0))
+        for record in records:
+            slot = int(record["car"])
+            if not shown[slot]:
+                continue
+            if slot not in cars:
+                cars[slot] = CarServer(slot, None, None, screen, sprites, None)
+            restore(cars[slot], record)
+            cars[slot].draw()
+
+        # Exit On Quit Event
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sys.exit(0)
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_ESCAPE:
+                    sys.exit(0)
+
+        pygame.display.flip()
+        clock.tick(fps)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a race recorded by RaceRecorder, or export it")
+    parser.add_argument("recording", help="directory of the recording")
+    parser.add_argument("--fps", type=int, default=60, help="ticks replayed per second")
+    parser.add_argument("--map", type=int, default=0, help="index of the map replayed when the race had several")
+    parser.add_argument("--export", metavar="DATASET", help="write a columnar .npz dataset instead of replaying")
+    args = parser.parse_args()
+
+    recording = Recording(args.recording)
+    if args.export:
+        recording.export(args.export)
+        print("{} records exported to {}".format(len(recording), args.export))
+    else:
+        replay(recording, args.fps, args.map)
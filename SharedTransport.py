@@ -0,0 +1,125 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Protocol import MSG_ACTION, MSG_RESET, NB_RADARS
+
+# Shared Memory Transport Between A RaceServer And Its Clients On The Same Host
+#
+# Every car owns one record of a shared memory block, used as its mailbox: the client
+# writes its command (and action) there, posts the server's doorbell semaphore, then
+# waits on its own answer semaphore, which the server posts once the observation,
+# reward and terminated flag are written back into the same record.
+# Nothing is serialized and no socket nor pipe is involved. The semaphores can only
+# be handed to processes when they are started (Process arguments, SubprocVecEnv
+# env_fns), from a context of the same start method as the one given here.
+
+COMMAND_NONE = 0  # Nothing Pending
+COMMAND_STEP = MSG_ACTION
+COMMAND_RESET = MSG_RESET
+COMMAND_HELLO = 5  # Client Attached, Answered When The Race Starts
+COMMAND_CLOSE = 6  # Client Gone, Not Answered
+
+SLOT_DTYPE = np.dtype([("command", "u1"), ("action", "<f4", (2,)),
+                       ("obs", "<f4", (NB_RADARS,)), ("reward", "<f4"), ("terminated", "u1")])
+
+
+class SharedTransport:
+    """
+    One mailbox per car in shared memory plus the semaphores signaling them.
+
+    Created by the process running the race (see Main), then passed to
+    the server (SharedSlot endpoints, wait, pending) and to the clients
+    (request), in this process or in the processes it starts.
+    """
+
+    def __init__(self, nb_cars, start_method="forkserver"):
+        context = multiprocessing.get_context(start_method)
+        self.nb_cars = nb_cars
+        self.start_method = start_method
+        self.owner = True  # Only The Creator Unlinks The Block
+        self.memory = shared_memory.SharedMemory(create=True, size=nb_cars * SLOT_DTYPE.itemsize)
+        self.doorbell = context.Semaphore(0)  # Posted Once Per Client Request
+        self.answers = [context.Semaphore(0) for _ in range(nb_cars)]  # Posted Once Per Server Answer
+        self.slots = np.ndarray(nb_cars, dtype=SLOT_DTYPE, buffer=self.memory.buf)
+        self.slots[:] = 0
+
+    def __getstate__(self):
+        return {"nb_cars": self.nb_cars, "start_method": self.start_method, "name": self.memory.name,
+                "doorbell": self.doorbell, "answers": self.answers}
+
+    def __setstate__(self, state):
+        self.nb_cars = state["nb_cars"]
+        self.start_method = state["start_method"]
+        self.owner = False
+        self.memory = shared_memory.SharedMemory(name=state["name"])
+        self.doorbell = state["doorbell"]
+        self.answers = state["answers"]
+        self.slots = np.ndarray(self.nb_cars, dtype=SLOT_DTYPE, buffer=self.memory.buf)
+
+    def close(self):
+        del self.slots  # The Block Can't Be Closed While A View On It Exists
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    # Client Side
+
+    def request(self, slot, command, action=None):
+        # Post A Command And Wait For Its Answer, Returned As A Copy Of The Record
+        if action is not None:
+            self.slots["action"][slot] = np.asarray(action, dtype=np.float32).reshape(2)
+        self.slots["command"][slot] = command
+        self.doorbell.release()
+        if command == COMMAND_CLOSE:
+            return None
+        self.answers[slot].acquire()
+        return self.slots[slot].copy()
+
+    # Server Side
+
+    def wait(self, timeout=None):
+        # Block Until At Least One Request Was Posted (Or The Timeout Expired)
+        # Extra Posts Are Drained: Callers Look At pending() For The Actual Requests
+        if not self.doorbell.acquire(timeout=timeout):
+            return False
+        while self.doorbell.acquire(block=False):
+            pass
+        return True
+
+    def pending(self, slot):
+        return self.slots["command"][slot] != COMMAND_NONE
+
+    def endpoint(self, slot):
+        return SharedSlot(self, slot)
+
+
+class SharedSlot:
+    """
+    Server side of one mailbox, used by CarServer in place of its socket.
+    """
+
+    def __init__(self, transport, slot):
+        self.transport = transport
+        self.slot = slot
+        self.record = transport.slots[slot:slot + 1]
+
+    def receive(self):
+        # Take The Pending Command: (command, action), COMMAND_NONE If There Is None Yet
+        command = int(self.record["command"][0])
+        if command == COMMAND_NONE:
+            return COMMAND_NONE, None
+        action = self.record["action"][0].tolist()
+        self.record["command"] = COMMAND_NONE
+        return command, action
+
+    def answer(self, obs=None, reward=0, terminated=False):
+        if obs is not None:
+            self.record["obs"] = obs
+            self.record["reward"] = reward
+            self.record["terminated"] = terminated
+        self.transport.answers[self.slot].release()
+
+    def close(self):
+        self.record = None
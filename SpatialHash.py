@@ -0,0 +1,58 @@
+import numpy as np
+
+# Cells Are Keyed By (Column + 1) * KEY_STRIDE + (Row + 1): Points Never Have Negative
+# Coordinates, So The Cells Around Them (Row Or Column -1 Included) Get Distinct Keys
+KEY_STRIDE = 1 << 20
+
+NEIGHBOUR_CELLS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+class SpatialHash:
+    """
+    Uniform grid over a set of points (the car centers of a RaceWorld),
+    rebuilt with build() every tick.
+
+    The points are sorted by the key of their cell, so a cell is a range
+    of that order found by binary search. candidates() lists, for every
+    query, the points of its cell and of the 8 cells around it: every
+    point closer than `cell_size` to the query is among them, and the cost
+    grows with the number of close pairs instead of queries * points.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.order = np.zeros(0, dtype=np.int64)  # Point Indices Sorted By Cell Key
+        self.keys = np.zeros(0, dtype=np.int64)  # Sorted Cell Keys Of The Points
+
+    def cells(self, points):
+        return np.floor_divide(np.asarray(points, dtype=np.float64), self.cell_size).astype(np.int64)
+
+    def build(self, points):
+        # points: Shape (N, 2)
+        cells = self.cells(points)
+        keys = (cells[:, 0] + 1) * KEY_STRIDE + cells[:, 1] + 1
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def candidates(self, queries):
+        # (query index, point index) Of Every Point In The 3 x 3 Cells Around Every Query, As Two Arrays
+        cells = self.cells(queries)
+        query_parts = []
+        point_parts = []
+        for dx, dy in NEIGHBOUR_CELLS:
+            keys = (cells[:, 0] + 1 + dx) * KEY_STRIDE + cells[:, 1] + 1 + dy
+            first = np.searchsorted(self.keys, keys, side="left")
+            counts = np.searchsorted(self.keys, keys, side="right") - first
+            total = counts.sum()
+            if total == 0:
+                continue
+
+            # Expand Every [first, first + count) Range Into Positions In self.order
+            owners = np.repeat(np.arange(len(cells)), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            query_parts.append(owners)
+            point_parts.append(self.order[first[owners] + offsets])
+
+        if not query_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(query_parts), np.concatenate(point_parts)
@@ -0,0 +1,74 @@
+import os
+
+import pygame
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+CAR_SPRITE_PATH = os.path.join(ASSETS_DIR, 'car.png')
+CAR_SPRITE_SIZE = (60, 60)
+
+SPRITE_ANGLE_BINS = 360  # One Pre-Rotated Sprite Per Degree
+
+RADAR_COLOR = (0, 255, 0)
+
+
+def rotate_center(image, angle):
+    # Rotate The Rectangle
+    rectangle = image.get_rect()
+    rotated_image = pygame.transform.rotate(image, angle)
+    rotated_rectangle = rectangle.copy()
+    rotated_rectangle.center = rotated_image.get_rect().center
+    rotated_image = rotated_image.subsurface(rotated_rectangle).copy()
+    return rotated_image
+
+
+class SpriteCache:
+    """
+    A sprite loaded and scaled once, with its rotations kept in angle bins.
+
+    Nothing is loaded nor rotated until a frame is actually drawn: physics
+    code never touches the cache, renderers call rotated(angle).
+    """
+
+    def __init__(self, path=CAR_SPRITE_PATH, size=CAR_SPRITE_SIZE, bins=SPRITE_ANGLE_BINS):
+        self.path = path
+        self.size = size
+        self.bins = bins
+        self.image = None
+        self.rotations = [None] * bins
+
+    def sprite(self):
+        if self.image is None:
+            image = pygame.image.load(self.path)
+            if pygame.display.get_surface() is not None:
+                image = image.convert()  # Convert Speeds Up A Lot
+            self.image = pygame.transform.scale(image, self.size)
+        return self.image
+
+    def rotated(self, angle):
+        index = round(angle * self.bins / 360) % self.bins
+        if self.rotations[index] is None:
+            self.rotations[index] = rotate_center(self.sprite(), index * 360 / self.bins)
+        return self.rotations[index]
+
+    def prerender(self):
+        # Rotate Every Bin Upfront (Before A Race Is Watched Live For Example)
+        for index in range(self.bins):
+            self.rotated(index * 360 / self.bins)
+
+
+SPRITE_CACHES = {}
+
+
+def get_sprite_cache(path=CAR_SPRITE_PATH, size=CAR_SPRITE_SIZE):
+    # One Shared Cache Per Sprite File And Size In The Process
+    key = (os.path.abspath(path), tuple(size))
+    if key not in SPRITE_CACHES:
+        SPRITE_CACHES[key] = SpriteCache(path, size)
+    return SPRITE_CACHES[key]
+
+
+def draw_radar(screen, center, position):
+    # Line From The Car To The End Of Its Radar, Returns The Rectangle Drawn Over
+    line = pygame.draw.line(screen, RADAR_COLOR, center, position, 1)
+    return line.union(pygame.draw.circle(screen, RADAR_COLOR, position, 5))
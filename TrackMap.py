@@ -0,0 +1,136 @@
+import numpy as np
+import pygame
+
+BORDER_COLOR = (255, 255, 255, 255)  # Color To Crash on Hit
+
+SECTOR1_COLOR = (0, 0, 255, 255)
+SECTOR2_COLOR = (0, 255, 0, 255)
+SECTOR3_COLOR = (255, 0, 0, 255)
+
+# Labels Stored In The Classification Grid
+FREE = 0
+BORDER = 1
+SECTOR1 = 2
+SECTOR2 = 3
+SECTOR3 = 4
+OUT_OF_BOUNDS = 5
+
+# Labels That Stop A Radar Ray (Everything But Free Road)
+RADAR_STOPS = frozenset((BORDER, SECTOR1, SECTOR2, SECTOR3, OUT_OF_BOUNDS))
+
+# Distances In The Distance Field Are Clipped To This Value (Fits In uint8)
+DISTANCE_FIELD_MAX = 64
+
+LABEL_COLORS = {
+    BORDER: BORDER_COLOR,
+    SECTOR1: SECTOR1_COLOR,
+    SECTOR2: SECTOR2_COLOR,
+    SECTOR3: SECTOR3_COLOR,
+}
+
+
+class TrackMap:
+    """
+    Map decoded once into a uint8 label grid (see the labels above).
+
+    `labels` is indexed [y, x]. `cells` is the same grid as a flat memoryview
+    of bytes, so the per-pixel loops of the car physics can read a label with
+    a plain index instead of a Surface.get_at call.
+    """
+
+    def __init__(self, surface):
+        width, height = surface.get_size()
+
+        # surfarray Is Indexed [x, y] -> Transpose To Row Major [y, x]
+        rgb = pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+        labels = np.full((height, width), FREE, dtype=np.uint8)
+        for label, color in LABEL_COLORS.items():
+            labels[np.all(rgb == color[:3], axis=2)] = label
+
+        self.set_labels(labels)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pygame.image.load(path))
+
+    @classmethod
+    def from_labels(cls, labels, framed_labels=None):
+        # Grids Decoded Before (See MapCache), Used Without Copies So Read-Only Memory Maps Stay Shared
+        track = cls.__new__(cls)
+        track.set_labels(labels, framed_labels)
+        return track
+
+    def set_labels(self, labels, framed_labels=None):
+        self.height, self.width = labels.shape
+        self.labels = labels
+        self.cells = memoryview(labels.reshape(-1))
+        # Same Grid With A One Pixel OUT_OF_BOUNDS Frame, For Vectorized Lookups Without Bound Checks
+        if framed_labels is None:
+            framed_labels = np.pad(labels, 1, constant_values=OUT_OF_BOUNDS)
+        self.framed_labels = framed_labels
+
+        self.distance_fields = {}  # Stop Labels -> (Field, Flat Memoryview Of The Field)
+
+    def label_at(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x]
+        return OUT_OF_BOUNDS
+
+    def labels_at(self, x, y):
+        # Vectorized label_at For Integer Arrays Of Coordinates
+        # Anything Off The Map Is Clipped Onto The OUT_OF_BOUNDS Frame
+        return self.framed_labels.ravel()[self.framed_index(x, y)]
+
+    def framed_index(self, x, y):
+        # Flat Index In The Framed Grids Of Integer Arrays Of Coordinates
+        return (np.clip(y, -1, self.height) + 1) * (self.width + 2) + (np.clip(x, -1, self.width) + 1)
+
+    def distance_field(self, stops=RADAR_STOPS):
+        """
+        Euclidean distance (in pixels, floored, clipped to DISTANCE_FIELD_MAX)
+        from every pixel to the nearest pixel whose label is in `stops`.
+        Outside of the map counts as a stop when OUT_OF_BOUNDS is in `stops`.
+        Computed on first use and cached per set of stop labels.
+        """
+        stops = frozenset(stops)
+        if stops not in self.distance_fields:
+            self.set_distance_field(stops, self.compute_distance_field(stops))
+        return self.distance_fields[stops][0]
+
+    def set_distance_field(self, stops, field):
+        # A Field Computed Before (See MapCache)
+        self.distance_fields[frozenset(stops)] = (field, memoryview(field.reshape(-1)))
+
+    def distance_cells(self, stops=RADAR_STOPS):
+        self.distance_field(stops)
+        return self.distance_fields[frozenset(stops)][1]
+
+    def compute_distance_field(self, stops):
+        cap = DISTANCE_FIELD_MAX
+        far = cap + 1
+        obstacles = np.isin(self.labels, [label for label in stops if label != OUT_OF_BOUNDS])
+        edges = OUT_OF_BOUNDS in stops
+
+        # Pass 1: Distance To The Nearest Obstacle In The Same Column
+        column = np.empty((self.height, self.width), dtype=np.int32)
+        previous = np.full(self.width, 0 if edges else far, dtype=np.int32)
+        for y in range(self.height):
+            previous = np.where(obstacles[y], 0, np.minimum(previous + 1, far))
+            column[y] = previous
+        previous = np.full(self.width, 0 if edges else far, dtype=np.int32)
+        for y in range(self.height - 1, -1, -1):
+            previous = np.minimum(column[y], np.where(obstacles[y], 0, np.minimum(previous + 1, far)))
+            column[y] = previous
+
+        # Pass 2: Combine Columns Within The Cap Along Each Row (Exact Up To The Cap)
+        squared = column * column
+        best = squared.copy()
+        for dx in range(1, cap + 1):
+            np.minimum(best[:, dx:], squared[:, :-dx] + dx * dx, out=best[:, dx:])
+            np.minimum(best[:, :-dx], squared[:, dx:] + dx * dx, out=best[:, :-dx])
+
+        if edges:
+            x = np.arange(self.width, dtype=np.int32)
+            best = np.minimum(best, np.minimum(x + 1, self.width - x)[np.newaxis, :] ** 2)
+
+        return np.minimum(np.sqrt(best), cap).astype(np.uint8)
@@ -0,0 +1,341 @@
+import argparse
+import contextlib
+import datetime
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+CWD = os.getcwd()  # --output Is Relative To It
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+os.chdir(ROOT)
+
+import numpy as np
+import pygame
+
+with contextlib.redirect_stdout(sys.stderr):  # CarClient Prints On Import, Stdout Is For The JSON
+    from CarClient import CarClient, decode_reset_packet, decode_step_packet, encode_action_packet
+from CarServer import CarServer, RADAR_MAX_LENGTH, decode_action_packet, encode_reset_packet, encode_step_packet
+from Collision import COLLISION_MODES
+from Geometry import RADAR_DEGREES, car_directions
+from MapCache import compile_map, load_track
+from Protocol import (HEADER, MSG_ACTION, MSG_OBSERVATION, MSG_STEP, MessageReader, decode_records, encode_action,
+                      encode_observation, encode_step)
+from RaceServer import RaceServer
+from RaceWorld import CONTACT_GRACE, RaceWorld
+from Radar import RADAR_ENGINES
+from Sprites import get_sprite_cache, rotate_center
+from TrackMap import TrackMap
+
+# Microbenchmarks Of The Simulation Kernels And Of Client <-> Server Round Trips,
+# Written As JSON (Stdout Or --output) To Compare Runs Over Time:
+#   python benchmarks/BenchmarkSuite.py --output before.json
+# Every Result Is In Microseconds Per Operation, Best And Median Of `repeat` Runs
+
+NB_TICKS = 2000  # Single Car Ticks Per Map And Radar Engine
+NB_PACKETS = 20000
+NB_ROTATIONS = 2000
+NB_ROUND_TRIPS = 2000
+NB_CONTACT_CARS = (100, 400, 1600)  # Cars Spread Over One Map For The Car-To-Car Contacts
+NB_WORLD_CARS = 64  # Cars Of The RaceWorld Stepped With Each Collision Mode
+REPEAT = 5
+SEED = 0
+
+MAP_PATHS = sorted(glob.glob('assets/map*.png'))
+
+
+def measure(function, count, repeat):
+    # `function` Runs `count` Operations
+    per_operation = [seconds / count * 1e6 for seconds in timeit.repeat(function, number=1, repeat=repeat)]
+    return {"best_us": min(per_operation), "median_us": statistics.median(per_operation),
+            "operations": count, "repeat": repeat}
+
+
+def new_car(track, radar_engine):
+    # A Car Without Connection Nor Screen, Only Its Physics Are Used
+    car = CarServer(0, None, None, None, None, track, radar_engine)
+    car.update()
+    return car
+
+
+def drive(track, radar_engine, actions):
+    # Every State Of A Car Driving With `actions`, Restarting When It Crashes
+    car = new_car(track, radar_engine)
+    states = []
+    for action in actions:
+        car.action(action)
+        car.update()
+        states.append((list(car.center), car.angle, car.distance, car.time, car.sectorReward))
+        if not car.alive:
+            car = new_car(track, radar_engine)
+    return states
+
+
+def restore(car, state):
+    center, angle, distance, time, sector_reward = state
+    car.center = center
+    car.angle = angle
+    car.directions = car_directions(angle)
+    car.distance = distance
+    car.time = time
+    car.sectorReward = sector_reward
+
+
+def benchmark_map(path, actions, repeat):
+    # Whole update() Of One Car, And Per Ray Cost Of check_radar, For Each Radar Engine
+    track = load_track(path)  # Like In RaceServer
+    name = os.path.splitext(os.path.basename(path))[0]
+    results = {}
+
+    for radar_engine in RADAR_ENGINES:
+        def ticks():
+            car = new_car(track, radar_engine)
+            for action in actions:
+                car.action(action)
+                car.update()
+                if not car.alive:
+                    car = new_car(track, radar_engine)
+
+        states = drive(track, radar_engine, actions)
+        car = new_car(track, radar_engine)
+
+        def rays():
+            for state in states:
+                restore(car, state)
+                car.radars.clear()
+                for degree in RADAR_DEGREES:
+                    car.check_radar(degree)
+
+        results["{}.update.{}".format(name, radar_engine)] = measure(ticks, len(actions), repeat)
+        results["{}.check_radar.{}".format(name, radar_engine)] = measure(rays, len(states) * len(RADAR_DEGREES),
+                                                                           repeat)
+    return results
+
+
+def benchmark_car(path, actions, repeat):
+    # Map Independent Parts Of A Tick
+    track = load_track(path)
+    states = drive(track, "march", actions)
+    car = new_car(track, "march")
+
+    def corners():
+        for state in states:
+            restore(car, state)
+            car.calculate_corners()
+
+    def rewards():
+        for state in states:
+            restore(car, state)
+            car.get_reward()
+
+    def restores():
+        for state in states:
+            restore(car, state)
+
+    sprites = get_sprite_cache()
+    angles = [random.uniform(-720, 720) for _ in range(NB_ROTATIONS)]
+
+    def rotations():
+        sprite = sprites.sprite()
+        for angle in angles:
+            rotate_center(sprite, angle)
+
+    def cached_rotations():
+        for angle in angles:
+            sprites.rotated(angle)
+
+    sprites.prerender()
+    # calculate_corners And get_reward Include Restoring A State, Timed Alone As car.restore
+    return {
+        "car.restore": measure(restores, len(states), repeat),
+        "car.calculate_corners": measure(corners, len(states), repeat),
+        "car.get_reward": measure(rewards, len(states), repeat),
+        "sprites.rotate_center": measure(rotations, len(angles), repeat),
+        "sprites.rotated": measure(cached_rotations, len(angles), repeat),
+    }
+
+
+def benchmark_car_contacts(path, repeat):
+    # RaceWorld.check_cars Per Car, With Cars Spread Uniformly Over The Map: Flat When Near-Linear
+    track = load_track(path)
+    rng = np.random.default_rng(SEED)
+    results = {}
+    for nb_cars in NB_CONTACT_CARS:
+        for contacts, options in (("collisions", {"car_collisions": True}), ("radars", {"car_radars": True})):
+            world = RaceWorld(track, nb_cars, **options)
+            world.reset()
+            world.time[:] = CONTACT_GRACE
+            world.center[:] = rng.uniform(100, 1800, (nb_cars, 2))
+            slots = np.arange(nb_cars)
+            results["world.car_{}.{}".format(contacts, nb_cars)] = measure(lambda: world.check_cars(slots), nb_cars,
+                                                                          repeat)
+    return results
+
+
+def benchmark_collision(path, actions, repeat):
+    # Whole RaceWorld.step Per Car With Each Collision Mode, Crashed Cars Reset
+    track = load_track(path)
+    results = {}
+    for collision in COLLISION_MODES:
+        world = RaceWorld(track, NB_WORLD_CARS, collision=collision)
+
+        def steps():
+            world.reset()
+            for action in actions:
+                world.step(np.tile(action, (NB_WORLD_CARS, 1)))
+                crashed = np.flatnonzero(~world.alive)
+                if len(crashed):
+                    world.reset(crashed)
+
+        results["world.step.{}".format(collision)] = measure(steps, len(actions) * NB_WORLD_CARS, repeat)
+    return results
+
+
+def benchmark_map_loading(path, repeat):
+    # Startup Cost Of A Map In A New Process: Decoded From The PNG, Or Memory-Mapped From The Cache
+    compile_map(path)
+
+    def decode():
+        track = TrackMap.load(path)
+        track.distance_field()
+
+    return {
+        "map.decode": measure(decode, 1, repeat),
+        "map.load_cached": measure(lambda: load_track(path), 1, repeat),
+    }
+
+
+def benchmark_packets(repeat):
+    # Encoding And Decoding Of Every Packet, Text (Regexes) And Binary (See Protocol)
+    rng = random.Random(SEED)
+    actions = [[rng.uniform(-1, 1), rng.uniform(-1, 1)] for _ in range(NB_PACKETS)]
+    radars = [[rng.randrange(RADAR_MAX_LENGTH) for _ in RADAR_DEGREES] for _ in range(NB_PACKETS)]
+    rewards = [rng.uniform(0, 100) for _ in range(NB_PACKETS)]
+
+    text_actions = [encode_action_packet(action).decode('utf-8') for action in actions]
+    text_steps = [encode_step_packet(obs, reward, reward > 90).decode('utf-8') for obs, reward in zip(radars, rewards)]
+    text_resets = [encode_reset_packet(obs).decode('utf-8') for obs in radars]
+
+    binary_obs = [np.asarray(obs) / RADAR_MAX_LENGTH for obs in radars]
+    binary_actions = [encode_action(action)[HEADER.size:] for action in actions]
+    binary_steps = [encode_step(obs, reward, reward > 90)[HEADER.size:] for obs, reward in zip(binary_obs, rewards)]
+    binary_resets = [encode_observation(obs)[HEADER.size:] for obs in binary_obs]
+    frames = b"".join(encode_action(action) for action in actions)
+
+    def read_frames():
+        reader = MessageReader()
+        reader.feed(frames)
+        while reader.next_message() is not None:
+            pass
+
+    operations = {
+        "text.encode_action": lambda: [encode_action_packet(action) for action in actions],
+        "text.decode_action": lambda: [decode_action_packet(packet) for packet in text_actions],
+        "text.encode_step": lambda: [encode_step_packet(obs, reward, False) for obs, reward in zip(radars, rewards)],
+        "text.decode_step": lambda: [decode_step_packet(packet) for packet in text_steps],
+        "text.encode_reset": lambda: [encode_reset_packet(obs) for obs in radars],
+        "text.decode_reset": lambda: [decode_reset_packet(packet) for packet in text_resets],
+        "binary.encode_action": lambda: [encode_action(action) for action in actions],
+        "binary.decode_action": lambda: [decode_records(MSG_ACTION, payload) for payload in binary_actions],
+        "binary.encode_step": lambda: [encode_step(obs, reward, False) for obs, reward in zip(binary_obs, rewards)],
+        "binary.decode_step": lambda: [decode_records(MSG_STEP, payload) for payload in binary_steps],
+        "binary.encode_reset": lambda: [encode_observation(obs) for obs in binary_obs],
+        "binary.decode_reset": lambda: [decode_records(MSG_OBSERVATION, payload) for payload in binary_resets],
+        "binary.read_frames": read_frames,
+    }
+    return {name: measure(function, NB_PACKETS, repeat) for name, function in operations.items()}
+
+
+def benchmark_round_trip(protocol, repeat):
+    # One CarClient Stepping A CarServer Of A Headless RaceServer Thread Over Loopback TCP
+    server = RaceServer(1, 1, physics="car", headless=True)  # Listening Once Built
+    race = threading.Thread(target=server.run)
+    race.start()
+
+    env = CarClient(0, protocol)
+    env.reset()
+
+    def steps():
+        for _ in range(NB_ROUND_TRIPS):
+            _, _, terminated, _, _ = env.step([0.1, -0.2])
+            if terminated:
+                env.reset()
+
+    result = measure(steps, NB_ROUND_TRIPS, repeat)
+    env.conn.close()
+    race.join()
+    server.server.close()
+    return {"round_trip.{}".format(protocol): result}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    random.seed(SEED)
+    rng = random.Random(SEED)
+    actions = [[rng.uniform(-1, 1), rng.uniform(-1, 1)] for _ in range(args.ticks)]
+    pygame.init()
+
+    results = {}
+    for path in MAP_PATHS:
+        results.update(benchmark_map(path, actions, args.repeat))
+    results.update(benchmark_car(MAP_PATHS[0], actions, args.repeat))
+    results.update(benchmark_car_contacts(MAP_PATHS[0], args.repeat))
+    results.update(benchmark_collision(MAP_PATHS[0], actions, args.repeat))
+    results.update(benchmark_map_loading(MAP_PATHS[0], args.repeat))
+    results.update(benchmark_packets(args.repeat))
+    if not args.no_network:
+        for protocol in ("text", "binary"):
+            results.update(benchmark_round_trip(protocol, args.repeat))
+
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ticks": args.ticks,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the simulation and of the protocols (JSON)")
+    parser.add_argument("--output", help="JSON file to write, stdout if not given")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs of every benchmark")
+    parser.add_argument("--ticks", type=int, default=NB_TICKS, help="car ticks per map and radar engine")
+    parser.add_argument("--no-network", action="store_true", help="skip the loopback round trips")
+    args = parser.parse_args()
+
+    # The Servers And Clients Print Their Progress: Keep Stdout For The JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+
+    if args.output:
+        with open(os.path.join(CWD, args.output), "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Geometry import ANGLE_STEP, RADAR_DEGREES, car_directions
+
+# Trigonometry Of One Car Tick (Heading, Four Corners, Five Radar Directions)
+# Computed With math.cos / math.sin Versus Geometry.car_directions As Used By CarServer,
+# For Angles On The Table Bins (Text Protocol) And Off Them (Continuous float32 Steering)
+
+CENTER = (860.0, 950.0)
+LENGTH = 30.0
+NB_ANGLES = 10000
+
+
+def tick_trig(angle):
+    heading = (math.cos(math.radians(360 - angle)), math.sin(math.radians(360 - angle)))
+    corners = [[CENTER[0] + math.cos(math.radians(360 - (angle + d))) * LENGTH,
+                CENTER[1] + math.sin(math.radians(360 - (angle + d))) * LENGTH] for d in (30, 150, 210, 330)]
+    radars = [(math.cos(math.radians(360 - (angle + d))), math.sin(math.radians(360 - (angle + d))))
+              for d in RADAR_DEGREES]
+    return heading, corners, radars
+
+
+def tick_tables(angle):
+    heading, corner_directions, radars = car_directions(angle)
+    corners = [[CENTER[0] + dx * LENGTH, CENTER[1] + dy * LENGTH] for dx, dy in corner_directions]
+    return heading, corners, radars
+
+
+def main():
+    random.seed(0)
+    angles = {
+        # Sums Of Two Decimal Steerings, Like The Text Protocol
+        "on bin": [round(random.uniform(-1, 1), 2) * 8 * random.randrange(50) for _ in range(NB_ANGLES)],
+        # Any Angle, Like Continuous Actions
+        "off bin": [random.uniform(-3600, 3600) + ANGLE_STEP / 3 for _ in range(NB_ANGLES)],
+    }
+
+    for angle_name, tick_angles in angles.items():
+        for name, tick in (("math", tick_trig), ("tables", tick_tables)):
+            seconds = min(timeit.repeat(lambda: [tick(angle) for angle in tick_angles], number=1, repeat=5))
+            print("{:7s} {:7s} {:6.2f} us/tick".format(angle_name, name, seconds / NB_ANGLES * 1e6))
+
+
+if __name__ == '__main__':
+    main()
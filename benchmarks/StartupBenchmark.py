@@ -0,0 +1,70 @@
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+os.chdir(ROOT)
+
+# Time To First Step Of A Training Run Started From Scratch, Like Main.py Headless:
+# A Fresh Interpreter Starts A RaceServer Thread And A SubprocVecEnv Of CarClient
+# Workers, Which Connect, Reset And Send Their First Action
+#   python benchmarks/StartupBenchmark.py [WORKERS ...]
+# Nothing Heavy Is Imported At The Top: The Workers' Fork Server Imports This Module
+
+NB_WORKERS = (1, 32)
+PROTOCOL = "binary"
+REPEAT = 3
+
+
+def first_step(nb_workers):
+    # Runs In The Fresh Interpreter, Prints The Seconds From Starting The Server To The First Step
+    import numpy as np
+    from Main import make_vec_env, thread_race
+
+    start = time.perf_counter()
+    race = threading.Thread(target=thread_race, args=(nb_workers, 1, True), daemon=True)
+    race.start()
+    env = make_vec_env(nb_workers, PROTOCOL)
+    env.reset()
+    env.step(np.zeros((nb_workers, 2), dtype=np.float32))
+    seconds = time.perf_counter() - start
+    env.close()
+    race.join()
+    print("first_step {:.3f}".format(seconds))
+
+
+def timed_run(arguments):
+    # Wall Time Of A Fresh Interpreter Until It Exits, And What It Printed
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable] + arguments, capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - start, output
+
+
+def child_seconds(output):
+    return float(next(line.split()[1] for line in output.splitlines() if line.startswith("first_step ")))
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        first_step(int(sys.argv[2]))
+        return
+
+    imports = [timed_run(["-c", "import CarClient"])[0] for _ in range(REPEAT)]
+    print("import CarClient       {:7.3f}s (median of {})".format(statistics.median(imports), REPEAT))
+
+    for nb_workers in [int(arg) for arg in sys.argv[1:]] or NB_WORKERS:
+        runs = [timed_run([os.path.abspath(__file__), "--child", str(nb_workers)]) for _ in range(REPEAT)]
+        total = statistics.median(seconds for seconds, _ in runs)
+        in_process = statistics.median(child_seconds(output) for _, output in runs)
+        print("{:2d} workers first step {:7.3f}s (median of {}, {:.3f}s after the launcher's imports)".format(
+            nb_workers, total, REPEAT, in_process))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CarClient import CarClient, SharedCarClient
+from RaceServer import RaceServer
+from SharedTransport import SharedTransport
+
+# Round Trip Latency And CPU Per Step Of A RaceServer With Client Processes
+# Talking Over Loopback TCP ("text", "binary") Or Shared Memory ("shared")
+
+NB_CARS = 4
+NB_STEPS = 5000
+START_METHOD = "forkserver"
+
+
+def client(rank, protocol, transport, results):
+    env = SharedCarClient(transport, rank) if transport is not None else CarClient(rank, protocol)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(NB_STEPS):
+        _, _, terminated, _, _ = env.step([0.1, -0.2])
+        if terminated:
+            env.reset()
+    results.put(time.perf_counter() - start)
+    if transport is not None:
+        env.close()
+    else:
+        env.conn.close()
+
+
+def run(protocol):
+    context = multiprocessing.get_context(START_METHOD)
+    transport = SharedTransport(NB_CARS, START_METHOD) if protocol == "shared" else None
+    server = RaceServer(NB_CARS, 4, headless=True, transport=transport)
+    race = threading.Thread(target=server.run)
+    race.start()
+
+    results = context.Queue()
+    clients = [context.Process(target=client, args=(rank, protocol, transport, results)) for rank in range(NB_CARS)]
+    cpu = os.times()
+    for process in clients:
+        process.start()
+    seconds = max(results.get() for _ in clients)
+    for process in clients:
+        process.join()
+    race.join()
+    cpu_end = os.times()
+
+    if transport is not None:
+        transport.close()
+    else:
+        server.server.close()
+
+    cpu_seconds = sum(cpu_end[:4]) - sum(cpu[:4])
+    return seconds / NB_STEPS * 1e6, cpu_seconds / (NB_STEPS * NB_CARS) * 1e6
+
+
+def main():
+    protocols = sys.argv[1:] or ["text", "binary", "shared"]
+    results = {protocol: run(protocol) for protocol in protocols}
+    for protocol, (latency, cpu) in results.items():
+        print("{:7s} {:7.1f} us/step latency {:7.1f} us CPU/car step".format(protocol, latency, cpu))
+
+
+if __name__ == '__main__':
+    main()